@@ -0,0 +1,94 @@
+"""
+SevaSetu — Intent Extraction Load Benchmark
+Fires concurrent extract_intent calls at the fake LLM stand-in
+(INTENT_LLM=fake) and compares unbatched calls with micro-batching windows:
+wall time, messages/sec, per-request latency percentiles and LLM prompts sent.
+
+Run from the backend directory:
+    python -m benchmarks.bench_intent --messages 200 --concurrency 50 --windows 0,5,20
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+# Local stand-in for Gemini and no shared cache file; set before intent_engine reads them
+os.environ["INTENT_LLM"] = "fake"
+os.environ["INTENT_CACHE_PATH"] = ""
+
+import numpy as np
+
+import intent_engine
+from benchmarks.synthetic_catalog import generate_queries
+
+
+def _percentiles(samples: list) -> dict:
+    ms = np.asarray(samples) * 1e3
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 1),
+        "p95_ms": round(float(np.percentile(ms, 95)), 1),
+        "max_ms": round(float(ms.max()), 1),
+    }
+
+
+async def _run(messages: list, concurrency: int, window_ms: float) -> dict:
+    intent_engine.BATCH_WINDOW_SECONDS = window_ms / 1000
+    intent_engine._get_intent_cache().clear()
+    prompts = 0
+    generate = intent_engine._generate_sync
+
+    def counting(prompt):
+        nonlocal prompts
+        prompts += 1
+        return generate(prompt)
+
+    intent_engine._generate_sync = counting
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(text):
+        async with gate:
+            start = time.perf_counter()
+            await intent_engine.extract_intent(text)
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(text) for text in messages))
+    finally:
+        intent_engine._generate_sync = generate
+    elapsed = time.perf_counter() - started
+    return {
+        "window_ms": window_ms,
+        "seconds": round(elapsed, 2),
+        "messages_per_sec": round(len(messages) / elapsed, 1),
+        "llm_prompts": prompts,
+        **_percentiles(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched intent extraction against a fake LLM")
+    parser.add_argument("--messages", type=int, default=200, help="distinct user messages to extract")
+    parser.add_argument("--concurrency", type=int, default=50, help="requests in flight at once")
+    parser.add_argument("--windows", default="0,5,20", help="comma-separated batch windows in ms (0 = unbatched)")
+    parser.add_argument("--latency-ms", type=float, default=300, help="fake LLM latency per prompt")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    intent_engine.FAKE_LATENCY_SECONDS = args.latency_ms / 1000
+    intent_engine.LLM_TIMEOUT_SECONDS = 600  # measure the LLM path, never the timeout fallback
+    messages = [f"{q} ({i})" for i, q in enumerate(generate_queries(args.messages, args.seed))]
+
+    print(f"[Benchmark] {args.messages} messages, {args.concurrency} concurrent, "
+          f"fake LLM {args.latency_ms:g} ms, {intent_engine.LLM_MAX_CONCURRENCY} LLM slots, "
+          f"batches of up to {intent_engine.BATCH_MAX_ITEMS}")
+    for window in (float(w) for w in args.windows.split(",")):
+        r = asyncio.run(_run(messages, args.concurrency, window))
+        print(f"  window={r['window_ms']:g}ms: {r['seconds']}s, {r['messages_per_sec']} msg/s, "
+              f"{r['llm_prompts']} prompts, p50 {r['p50_ms']}ms, p95 {r['p95_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
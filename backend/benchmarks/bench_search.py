@@ -0,0 +1,213 @@
+"""
+SevaSetu — Search & Matching Benchmark
+Measures index build time, memory footprint and query latency percentiles of
+vector_store and scheme_matcher on synthetic catalogs.
+
+Run from the backend directory:
+    python -m benchmarks.bench_search --sizes 10000,50000,100000 --top-k 5,20
+    python -m benchmarks.bench_search --compare benchmarks/results/<previous>.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Keep benchmark snapshots away from the service's index_cache
+os.environ.setdefault("SEVASETU_INDEX_DIR", tempfile.mkdtemp(prefix="sevasetu-bench-"))
+
+import numpy as np
+import sklearn
+
+import schemes_data
+import scheme_matcher
+import vector_store
+from benchmarks.synthetic_catalog import generate_schemes, generate_queries, generate_profiles
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BATCH_SIZE = 32
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (Linux), falling back to peak RSS."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _index_mb(gen) -> float:
+    """Bytes held by the generation's sparse matrices."""
+    total = 0
+    for matrix in (gen.matrix, gen.counts, gen.postings):
+        total += matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return total / 2**20
+
+
+def _percentiles(samples: list) -> dict:
+    ms = np.asarray(samples) * 1e3
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "mean_ms": round(float(ms.mean()), 4),
+        "samples": len(samples),
+    }
+
+
+def _time_each(fn, items: list) -> list:
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_catalog(size: int, top_ks: list, n_queries: int, seed: int) -> dict:
+    """Benchmark one catalog size across top_k values."""
+    schemes_data.set_schemes(generate_schemes(size, seed=seed))
+    queries = generate_queries(n_queries, seed=seed + 1)
+    profiles = generate_profiles(n_queries, seed=seed + 2)
+    loop = asyncio.new_event_loop()
+
+    gc.collect()
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    gen = vector_store.build_index(force=True)
+    build_seconds = time.perf_counter() - start
+    rss_after = _rss_mb()
+
+    start = time.perf_counter()
+    vector_store.build_index()
+    snapshot_load_seconds = time.perf_counter() - start
+
+    result = {
+        "catalog_size": size,
+        "vocabulary_size": len(gen.vocabulary),
+        "build_seconds": round(build_seconds, 4),
+        "snapshot_load_seconds": round(snapshot_load_seconds, 4),
+        "index_mb": round(_index_mb(gen), 3),
+        "rss_delta_mb": round(rss_after - rss_before, 3),
+        "latency": {},
+    }
+
+    for top_k in top_ks:
+        # Warm up code paths so the first measured call is not an outlier
+        vector_store.search(queries[0], top_k)
+
+        batches = [queries[i:i + BATCH_SIZE] for i in range(0, len(queries), BATCH_SIZE)]
+        batch_samples = []
+        for batch in batches:
+            start = time.perf_counter()
+            vector_store.search_many(batch, top_k)
+            batch_samples.append((time.perf_counter() - start) / len(batch))
+
+        def match(i):
+            scheme_matcher.clear_cache()
+            loop.run_until_complete(scheme_matcher.match_schemes(queries[i], profiles[i], top_k))
+
+        result["latency"][f"top_k={top_k}"] = {
+            "search": _percentiles(_time_each(lambda q: vector_store.search(q, top_k), queries)),
+            "search_filtered": _percentiles(_time_each(
+                lambda i: vector_store.search(queries[i], top_k, {"state": profiles[i]["state"]}),
+                range(len(queries)),
+            )),
+            "search_many_per_query": _percentiles(batch_samples),
+            "match_schemes_uncached": _percentiles(_time_each(match, range(len(queries)))),
+        }
+
+    loop.close()
+    return result
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _print_summary(report: dict):
+    print(f"\n{'size':>8} {'build s':>8} {'load s':>8} {'index MB':>9}  {'top_k':>6} "
+          f"{'search p50/p95/p99 ms':>24} {'match p50/p95/p99 ms':>24}")
+    for r in report["results"]:
+        for key, lat in r["latency"].items():
+            s, m = lat["search"], lat["match_schemes_uncached"]
+            print(f"{r['catalog_size']:>8} {r['build_seconds']:>8.2f} {r['snapshot_load_seconds']:>8.3f} "
+                  f"{r['index_mb']:>9.1f}  {key.split('=')[1]:>6} "
+                  f"{s['p50_ms']:>7.3f}/{s['p95_ms']:.3f}/{s['p99_ms']:.3f}".ljust(24) + " "
+                  f"{m['p50_ms']:>7.3f}/{m['p95_ms']:.3f}/{m['p99_ms']:.3f}")
+
+
+def _compare(report: dict, baseline_path: str):
+    """Print p50/p95 ratios (current / baseline) for matching measurements."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["catalog_size"]: r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path} (ratio < 1.0 is faster):")
+    for r in report["results"]:
+        base = baseline.get(r["catalog_size"])
+        if not base:
+            continue
+        print(f"  size={r['catalog_size']}: build x{r['build_seconds'] / max(base['build_seconds'], 1e-9):.2f}")
+        for key, lat in r["latency"].items():
+            for op, stats in lat.items():
+                old = base.get("latency", {}).get(key, {}).get(op)
+                if old:
+                    print(f"    {key} {op}: p50 x{stats['p50_ms'] / max(old['p50_ms'], 1e-9):.2f}, "
+                          f"p95 x{stats['p95_ms'] / max(old['p95_ms'], 1e-9):.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scheme search and matching on synthetic catalogs")
+    parser.add_argument("--sizes", default="10000,50000,100000", help="comma-separated catalog sizes")
+    parser.add_argument("--top-k", default="5,20", help="comma-separated top_k values")
+    parser.add_argument("--queries", type=int, default=300, help="queries per measurement")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    top_ks = [int(k) for k in args.top_k.split(",")]
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "platform": platform.platform(),
+            "queries": args.queries,
+            "seed": args.seed,
+        },
+        "results": [],
+    }
+    for size in sizes:
+        print(f"[Benchmark] Catalog size {size}...")
+        report["results"].append(bench_catalog(size, top_ks, args.queries, args.seed))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"search-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    _print_summary(report)
+    print(f"\n[Benchmark] Results written to {output}")
+    if args.compare:
+        _compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+SevaSetu — Synthetic Scheme Catalog
+Generates large, realistic catalogs in the schemes_data.SCHEMES shape for benchmarks.
+"""
+
+import random
+
+STATES = [
+    "Andhra Pradesh", "Bihar", "Chhattisgarh", "Goa", "Gujarat", "Haryana",
+    "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Maharashtra",
+    "Odisha", "Punjab", "Rajasthan", "Tamil Nadu", "Telangana",
+    "Uttar Pradesh", "Uttarakhand", "West Bengal", "Assam", "Manipur",
+    "Meghalaya", "Mizoram", "Nagaland", "Sikkim", "Tripura", "Arunachal Pradesh",
+]
+
+# category -> (name words, description phrases, benefit phrases, occupations, documents)
+CATEGORIES = {
+    "Agriculture": (
+        ["Kisan", "Krishi", "Fasal", "Beej", "Sinchai", "Pashudhan", "Matsya"],
+        ["income support to small and marginal farmers", "subsidy on seeds and fertilisers",
+         "crop insurance against drought and flood", "drip and sprinkler irrigation assistance",
+         "soil health testing for every landholding", "credit for animal husbandry and fishery",
+         "assistance for farm mechanisation and tractors", "price support for procured crops"],
+        ["₹6,000 per year in installments", "50% subsidy on equipment", "interest subvention of 3%",
+         "free soil health card", "insurance cover for notified crops"],
+        ["farmer", "tenant_farmer", "sharecropper", "agricultural_labourer", "animal_husbandry", "fishery"],
+        ["AADHAAR_CARD", "LAND_OWNERSHIP_RECORDS_ROR", "BANK_PASSBOOK", "CROP_SOWN_DETAILS"],
+    ),
+    "Housing": (
+        ["Awas", "Griha", "Ashraya", "Nivas", "Basera"],
+        ["pucca house for houseless rural families", "interest subsidy on home loans",
+         "repair of kutcha and dilapidated houses", "affordable rental housing for urban migrants",
+         "toilet construction under Swachh Bharat"],
+        ["₹1,20,000 construction assistance", "interest subsidy up to 6.5%", "₹12,000 for toilet"],
+        ["labourer", "construction_worker", "street_vendor"],
+        ["AADHAAR_CARD", "BPL_CERTIFICATE", "BANK_PASSBOOK", "INCOME_CERTIFICATE"],
+    ),
+    "Health": (
+        ["Arogya", "Swasthya", "Jan Aushadhi", "Matru", "Suraksha"],
+        ["cashless hospitalisation in empanelled hospitals", "free medicines at public facilities",
+         "maternity benefit for pregnant women", "health insurance for poor families",
+         "free dialysis and cancer treatment"],
+        ["₹5,00,000 cover per family", "₹5,000 maternity benefit", "free diagnostics"],
+        [],
+        ["AADHAAR_CARD", "RATION_CARD", "MOBILE_NUMBER_LINKED_TO_AADHAAR"],
+    ),
+    "Education": (
+        ["Vidya", "Shiksha", "Chhatravritti", "Medha", "Pratibha"],
+        ["scholarship for post-matric students", "free bicycles for girl students",
+         "fee reimbursement for professional courses", "hostel assistance for tribal students",
+         "coaching for competitive examinations"],
+        ["full tuition fee reimbursement", "monthly stipend of ₹1,200", "free laptop"],
+        ["student"],
+        ["AADHAAR_CARD", "CASTE_CERTIFICATE", "PREVIOUS_YEAR_MARKSHEET", "INCOME_CERTIFICATE"],
+    ),
+    "Livelihood": (
+        ["Mudra", "Udyam", "Swarozgar", "Svanidhi", "Shilpi"],
+        ["collateral-free loans for micro enterprises", "working capital for street vendors",
+         "training and toolkits for traditional artisans", "credit guarantee for new entrepreneurs",
+         "marketing support for self help groups"],
+        ["loan up to ₹10 lakh", "7% interest subsidy", "free toolkit worth ₹15,000"],
+        ["self_employed", "small_business", "artisan", "street_vendor", "entrepreneur"],
+        ["AADHAAR_CARD", "PAN_CARD", "BANK_STATEMENT_LAST_6_MONTHS", "BUSINESS_REGISTRATION_PROOF"],
+    ),
+    "Energy": (
+        ["Ujjwala", "Saubhagya", "Surya", "Urja"],
+        ["free LPG connection for poor households", "rooftop solar subsidy",
+         "household electricity connection", "solar pumps for irrigation"],
+        ["free LPG connection and first refill", "40% subsidy on rooftop solar"],
+        [],
+        ["AADHAAR_CARD", "RATION_CARD_BPL", "BANK_PASSBOOK"],
+    ),
+    "Employment": (
+        ["Rozgar", "Shramik", "Karmayogi", "Kaushal"],
+        ["guaranteed wage employment for rural households", "skill training for unemployed youth",
+         "pension for unorganised sector workers", "apprenticeship stipend for graduates"],
+        ["100 days of wage employment", "₹3,000 monthly pension", "₹8,000 training stipend"],
+        ["labourer", "construction_worker", "unemployed"],
+        ["AADHAAR_CARD", "MGNREGA_JOB_CARD", "BANK_POST_OFFICE_PASSBOOK"],
+    ),
+    "Women & Child": (
+        ["Sukanya", "Beti", "Mahila", "Poshan", "Kanya"],
+        ["savings account for the girl child", "nutrition support for pregnant women and children",
+         "cash incentive on the birth of a girl child", "financial assistance for widow remarriage"],
+        ["8.2% tax-free interest", "₹50,000 on marriage of daughter", "take-home ration"],
+        [],
+        ["GIRL_CHILD_BIRTH_CERTIFICATE", "PARENT_AADHAAR_CARD", "RESIDENTIAL_PROOF"],
+    ),
+}
+
+PREFIXES = ["Pradhan Mantri", "Mukhyamantri", "Rashtriya", "Rajya", "Jan", "Samagra"]
+SUFFIXES = ["Yojana", "Scheme", "Mission", "Abhiyan", "Nidhi", "Sahayata"]
+SOCIAL_CATEGORIES = ["SC", "ST", "OBC"]
+
+
+def _rules(rng: random.Random, occupations: list) -> dict:
+    """A plausible AND rule set."""
+    rules = []
+    if occupations and rng.random() < 0.7:
+        picked = rng.sample(occupations, k=rng.randint(1, min(3, len(occupations))))
+        rules.append({"field": "occupation", "operator": "in", "value": picked,
+                      "label": f"Applicant must be one of: {', '.join(picked)}"})
+    if rng.random() < 0.6:
+        ceiling = rng.choice([100000, 150000, 200000, 250000, 300000, 800000])
+        rules.append({"field": "income", "operator": "lte", "value": ceiling,
+                      "label": f"Annual household income must be ≤ ₹{ceiling:,}"})
+    if rng.random() < 0.5:
+        rules.append({"field": "age", "operator": "gte", "value": 18, "label": "Applicant must be 18 or older"})
+    if rng.random() < 0.15:
+        rules.append({"field": "age", "operator": "lte", "value": rng.choice([35, 40, 60, 75]),
+                      "label": "Applicant must be below the upper age limit"})
+    if rng.random() < 0.25:
+        residence = rng.choice(["rural", "urban"])
+        rules.append({"field": "residence", "operator": "eq", "value": residence,
+                      "label": f"Applicant must reside in a {residence} area"})
+    if rng.random() < 0.2:
+        rules.append({"field": "gender", "operator": "eq", "value": "female", "label": "Applicant must be a woman"})
+    if rng.random() < 0.2:
+        category = rng.choice(SOCIAL_CATEGORIES)
+        rules.append({"field": "category", "operator": "eq", "value": category,
+                      "label": f"Applicant must belong to the {category} category"})
+    if rng.random() < 0.2:
+        rules.append({"field": "land_holding", "operator": "lte", "value": rng.choice([1.0, 2.0, 5.0]),
+                      "label": "Land holding must not exceed the limit"})
+    return {"logic": "AND", "rules": rules}
+
+
+def generate_schemes(n: int, seed: int = 42) -> list:
+    """Generate n synthetic schemes with unique IDs, deterministically for a seed."""
+    rng = random.Random(seed)
+    categories = list(CATEGORIES)
+    schemes = []
+    for i in range(n):
+        category = rng.choice(categories)
+        words, phrases, benefits, occupations, documents = CATEGORIES[category]
+        state = "ALL" if rng.random() < 0.3 else rng.choice(STATES)
+        word = rng.choice(words)
+        name = f"{rng.choice(PREFIXES)} {word} {rng.choice(SUFFIXES)}"
+        if state != "ALL":
+            name = f"{state} {name}"
+        description = " ".join(
+            f"The scheme provides {phrase}." for phrase in rng.sample(phrases, k=min(3, len(phrases)))
+        )
+        schemes.append({
+            "scheme_id": f"SYN-{i:06d}",
+            "name": name,
+            "short_name": f"{word} {i}",
+            "category": category,
+            "description": f"{description} Implemented by the {'Government of India' if state == 'ALL' else state + ' government'}.",
+            "benefits": "; ".join(rng.sample(benefits, k=min(2, len(benefits)))),
+            "state": state,
+            "required_documents": rng.sample(documents, k=rng.randint(2, len(documents))),
+            "eligibility_rules": _rules(rng, occupations),
+            "official_website": f"https://schemes.example.gov.in/{i}",
+            "application_process": "Apply online or at the nearest Common Service Centre (CSC).",
+        })
+    return schemes
+
+
+def generate_queries(n: int, seed: int = 7) -> list:
+    """Generate n kiosk-style queries drawn from the same vocabulary."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        category = rng.choice(list(CATEGORIES))
+        words, phrases, _, occupations, _ = CATEGORIES[category]
+        parts = [rng.choice(words).lower()]
+        parts += rng.sample(rng.choice(phrases).split(), k=2)
+        if occupations and rng.random() < 0.5:
+            parts.append(rng.choice(occupations).replace("_", " "))
+        if rng.random() < 0.3:
+            parts.append(rng.choice(STATES).lower())
+        queries.append(" ".join(parts))
+    return queries
+
+
+def generate_profiles(n: int, seed: int = 11) -> list:
+    """Generate n citizen attribute dicts in the intent_engine key_attributes shape."""
+    rng = random.Random(seed)
+    occupations = sorted({o for c in CATEGORIES.values() for o in c[3]})
+    return [
+        {
+            "occupation": rng.choice(occupations),
+            "age": rng.randint(16, 80),
+            "gender": rng.choice(["male", "female"]),
+            "income": rng.choice([60000, 120000, 180000, 240000, 400000]),
+            "category": rng.choice(["General"] + SOCIAL_CATEGORIES),
+            "state": rng.choice(STATES),
+            "residence": rng.choice(["rural", "urban"]),
+            "land_holding": round(rng.uniform(0, 6), 1),
+        }
+        for _ in range(n)
+    ]
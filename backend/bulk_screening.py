@@ -0,0 +1,439 @@
+"""
+SevaSetu — Bulk Beneficiary Screening
+Screens every row of a beneficiary list (CSV or JSONL) against every scheme.
+
+Rows are streamed from the input in chunks and evaluated across a process
+pool, each worker holding the catalog's rules in columnar form
+(eligibility_matrix.RuleColumns). Results are written out in input order as
+they complete, with at most a few chunks in flight, so memory stays bounded
+regardless of file size.
+
+CLI, from the backend directory:
+    python -m bulk_screening beneficiaries.csv results.jsonl --workers 4
+
+The API runs the same screening as a background job: POST /eligibility/bulk
+uploads a file and returns a job id to poll. Job state is kept in
+BULK_DIR/<job_id>/job.json next to the input and results, so any API worker
+can report it; job directories are removed SEVASETU_BULK_JOB_TTL_HOURS after
+they were last updated.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from eligibility_matrix import RuleColumns
+from schemes_data import get_catalog
+
+BULK_DIR = os.getenv("SEVASETU_BULK_DIR", os.path.join(os.path.dirname(__file__), "bulk_jobs"))
+# sched_getaffinity sees the CPUs granted to this container; cpu_count() reports the host's
+_AVAILABLE_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+BULK_WORKERS = int(os.getenv("SEVASETU_BULK_WORKERS", "0")) or min(2, _AVAILABLE_CPUS)
+MAX_CONCURRENT_JOBS = int(os.getenv("SEVASETU_BULK_MAX_JOBS", "1"))
+# Largest beneficiary list accepted by the API (the CLI has no limit)
+BULK_MAX_BYTES = int(float(os.getenv("SEVASETU_BULK_MAX_MB", "200")) * 1024 * 1024)
+JOB_TTL_SECONDS = float(os.getenv("SEVASETU_BULK_JOB_TTL_HOURS", "24")) * 3600
+# Minimum time between job.json progress writes
+PROGRESS_SAVE_SECONDS = 1.0
+
+CHUNK_ROWS = 2000
+# Profiles x rules evaluated at once inside a worker; bounds the status matrices
+CELL_BUDGET = 4_000_000
+FORMATS = ("csv", "jsonl")
+
+_job_slots = threading.Semaphore(MAX_CONCURRENT_JOBS)
+
+
+class InputTooLarge(ValueError):
+    """The uploaded beneficiary list exceeded BULK_MAX_BYTES."""
+
+
+class BadRow:
+    """A JSONL line that is not a profile object; screened as a row error."""
+
+    def __init__(self, message: str):
+        self.message = message
+
+# Per-process rules, set by the pool initializer
+_columns = None
+
+
+def _format(path: str, explicit: str = None) -> str:
+    fmt = explicit or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}' for {path}; use .csv or .jsonl")
+    return fmt
+
+
+def _coerce(value: str):
+    """CSV cell -> Python value: blank is missing, true/false are booleans, numbers are numbers."""
+    if value is None:
+        return None
+    value = value.strip()
+    if value == "":
+        return None
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def read_profiles(path: str, fmt: str = None, id_field: str = "id"):
+    """
+    Yield profile dicts from a CSV or JSONL file, one at a time. CSV ids are
+    kept as strings ("007" stays "007") so results match the input rows.
+    JSONL lines that are not a JSON object are yielded as BadRow.
+    """
+    fmt = _format(path, fmt)
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                profile = {key.strip(): _coerce(value) for key, value in row.items() if key and key.strip() != id_field}
+                raw_id = next((value for key, value in row.items() if key and key.strip() == id_field), None)
+                profile[id_field] = (raw_id or "").strip() or None
+                yield profile
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    profile = json.loads(line)
+                except ValueError as e:
+                    yield BadRow(f"Invalid JSON: {e}")
+                    continue
+                if isinstance(profile, dict):
+                    yield profile
+                else:
+                    yield BadRow(f"Expected a JSON object, got {type(profile).__name__}")
+
+
+def _chunks(profiles, size: int):
+    chunk = []
+    for profile in profiles:
+        chunk.append(profile)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_worker(schemes: list):
+    global _columns
+    _columns = RuleColumns(schemes)
+
+
+def screen_chunk(start: int, profiles: list, id_field: str, columns: RuleColumns = None) -> list:
+    """Screen one chunk; returns one result dict per profile (with "error" for a BadRow)."""
+    columns = columns or _columns
+    results = [
+        {"row": start + i, "id": None, "eligible_count": 0, "eligible_schemes": [],
+         "missing_info_schemes": [], "error": p.message}
+        if isinstance(p, BadRow) else None
+        for i, p in enumerate(profiles)
+    ]
+    valid = [i for i, r in enumerate(results) if r is None]
+    step = max(1, CELL_BUDGET // max(columns.n_rules, len(columns), 1))
+    for offset in range(0, len(valid), step):
+        positions = valid[offset:offset + step]
+        batch = [profiles[i] for i in positions]
+        evaluation = columns.evaluate(batch)
+        scope = columns.state_scope([p.get("state") for p in batch])
+        eligible = evaluation["eligible"] & scope
+        blocked = evaluation["blocked_by_unknown"] & scope
+        for k, (i, profile) in enumerate(zip(positions, batch)):
+            eligible_ids = columns.scheme_ids[np.flatnonzero(eligible[k])].tolist()
+            results[i] = {
+                "row": start + i,
+                "id": profile.get(id_field),
+                "eligible_count": len(eligible_ids),
+                "eligible_schemes": eligible_ids,
+                "missing_info_schemes": columns.scheme_ids[np.flatnonzero(blocked[k])].tolist(),
+            }
+    return results
+
+
+class _Writer:
+    """Streams result rows to CSV or JSONL."""
+
+    def __init__(self, path: str, fmt: str):
+        self.fmt = fmt
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        if fmt == "csv":
+            self.csv = csv.writer(self.file)
+            self.csv.writerow(["row", "id", "eligible_count", "eligible_schemes", "missing_info_schemes", "error"])
+
+    def write(self, results: list):
+        for r in results:
+            if self.fmt == "csv":
+                self.csv.writerow([r["row"], r["id"], r["eligible_count"],
+                                   ";".join(r["eligible_schemes"]), ";".join(r["missing_info_schemes"]),
+                                   r.get("error", "")])
+            else:
+                self.file.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+def screen_file(input_path: str, output_path: str, workers: int = None, chunk_rows: int = CHUNK_ROWS,
+                id_field: str = "id", input_format: str = None, output_format: str = None,
+                progress=None) -> dict:
+    """
+    Screen every profile in input_path against the live catalog.
+
+    Args:
+        input_path: CSV (header row) or JSONL beneficiary list
+        output_path: where results are written, CSV or JSONL
+        workers: worker processes (default SEVASETU_BULK_WORKERS, else up to 2; 1 = in-process)
+        chunk_rows: profiles per task handed to a worker
+        id_field: profile field copied into each result row
+        progress: optional callable(rows_done, elapsed_seconds)
+
+    Returns:
+        dict with rows screened, elapsed seconds and rows_per_sec
+    """
+    workers = workers or BULK_WORKERS
+    in_fmt = _format(input_path, input_format)
+    out_fmt = _format(output_path, output_format)
+    schemes = get_catalog().schemes
+    chunks = _chunks(read_profiles(input_path, in_fmt, id_field), chunk_rows)
+
+    rows = 0
+    eligible = 0
+    errors = 0
+    started = time.perf_counter()
+    writer = _Writer(output_path, out_fmt)
+
+    def emit(results):
+        nonlocal rows, eligible, errors
+        writer.write(results)
+        rows += len(results)
+        eligible += sum(1 for r in results if r["eligible_count"])
+        errors += sum(1 for r in results if "error" in r)
+        if progress:
+            progress(rows, time.perf_counter() - started)
+
+    try:
+        if workers <= 1:
+            columns = RuleColumns(schemes)
+            for chunk in chunks:
+                emit(screen_chunk(rows, chunk, id_field, columns))
+        else:
+            # forkserver: workers must not be forked from a threaded API server
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(schemes,),
+                                     mp_context=multiprocessing.get_context("forkserver")) as pool:
+                pending = deque()
+                submitted = 0
+                for chunk in chunks:
+                    pending.append(pool.submit(screen_chunk, submitted, chunk, id_field))
+                    submitted += len(chunk)
+                    # Bounded in-flight work keeps memory flat; results leave in input order
+                    while len(pending) >= workers * 2:
+                        emit(pending.popleft().result())
+                while pending:
+                    emit(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows,
+        "rows_with_eligible_scheme": eligible,
+        "rows_with_error": errors,
+        "schemes": len(schemes),
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+# ─── Background jobs ───
+
+def _job_dir(job_id: str):
+    """Directory of a job, or None if job_id is not a job id (never a path outside BULK_DIR)."""
+    try:
+        return os.path.join(BULK_DIR, str(uuid.UUID(job_id)))
+    except (ValueError, TypeError):
+        return None
+
+
+def _save_job(job: dict):
+    """Atomically replace the job's job.json."""
+    path = os.path.join(_job_dir(job["job_id"]), "job.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(job, f)
+    os.replace(path + ".tmp", path)
+
+
+def _load_job(job_id: str):
+    job_dir = _job_dir(job_id)
+    if job_dir is None:
+        return None
+    try:
+        with open(os.path.join(job_dir, "job.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def prune_jobs(max_age: float = None) -> int:
+    """Delete job directories not updated for max_age seconds (default the job TTL). Returns how many."""
+    max_age = JOB_TTL_SECONDS if max_age is None else max_age
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        names = os.listdir(BULK_DIR)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        job_dir = _job_dir(name)
+        if job_dir is None:
+            continue
+        job_file = os.path.join(job_dir, "job.json")
+        try:
+            updated = os.path.getmtime(job_file if os.path.exists(job_file) else job_dir)
+        except OSError:
+            continue
+        if updated < cutoff:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            removed += 1
+    if removed:
+        print(f"[Bulk] Pruned {removed} old job(s)")
+    return removed
+
+
+def _run_job(job: dict):
+    with _job_slots:
+        job["status"] = "running"
+        job["started_at"] = datetime.now().isoformat()
+        _save_job(job)
+        last_saved = time.monotonic()
+
+        def progress(rows, elapsed):
+            nonlocal last_saved
+            job["rows"] = rows
+            job["rows_per_sec"] = round(rows / elapsed, 1) if elapsed > 0 else 0.0
+            if time.monotonic() - last_saved >= PROGRESS_SAVE_SECONDS:
+                _save_job(job)
+                last_saved = time.monotonic()
+
+        try:
+            stats = screen_file(job["input_path"], job["output_path"], id_field=job["id_field"],
+                                progress=progress)
+            job.update(stats)
+            job["status"] = "completed"
+            print(f"[Bulk] Job {job['job_id']}: {stats['rows']} rows at {stats['rows_per_sec']} rows/sec")
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            print(f"[Bulk] Job {job['job_id']} failed: {e}")
+        job["finished_at"] = datetime.now().isoformat()
+        _save_job(job)
+
+
+def start_job(source, filename: str, output_format: str = "jsonl", id_field: str = "id") -> dict:
+    """
+    Save an uploaded beneficiary list and screen it in a background thread.
+    source is a binary file object; the input format comes from filename.
+
+    Raises:
+        InputTooLarge: source holds more than BULK_MAX_BYTES
+    """
+    in_fmt = _format(filename)
+    out_fmt = _format(f"results.{output_format}")
+    prune_jobs()
+    job_id = str(uuid.uuid4())
+    job_dir = _job_dir(job_id)
+    os.makedirs(job_dir, exist_ok=True)
+    input_path = os.path.join(job_dir, f"input.{in_fmt}")
+    size = 0
+    with open(input_path, "wb") as f:
+        while chunk := source.read(1024 * 1024):
+            size += len(chunk)
+            if size > BULK_MAX_BYTES:
+                break
+            f.write(chunk)
+    if size > BULK_MAX_BYTES:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise InputTooLarge(f"File exceeds the {BULK_MAX_BYTES // (1024 * 1024)} MB bulk upload limit")
+
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "filename": filename,
+        "input_path": input_path,
+        "output_path": os.path.join(job_dir, f"results.{out_fmt}"),
+        "output_format": out_fmt,
+        "id_field": id_field,
+        "rows": 0,
+        "rows_per_sec": 0.0,
+        "created_at": datetime.now().isoformat(),
+    }
+    _save_job(job)
+    threading.Thread(target=_run_job, args=(job,), daemon=True, name=f"bulk-{job_id[:8]}").start()
+    return get_job(job_id)
+
+
+def get_job(job_id: str) -> dict:
+    """Public view of a job (None if unknown)."""
+    job = _load_job(job_id)
+    if not job:
+        return None
+    return {k: v for k, v in job.items() if k not in ("input_path", "output_path")}
+
+
+def job_output(job_id: str) -> str:
+    """Result file path of a completed job, else None."""
+    job = _load_job(job_id)
+    if not job or job["status"] != "completed":
+        return None
+    return job["output_path"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a beneficiary list against every scheme")
+    parser.add_argument("input", help="CSV (with header) or JSONL beneficiary list")
+    parser.add_argument("output", help="results file (.jsonl or .csv)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (1 = in-process)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="profiles per worker task")
+    parser.add_argument("--id-field", default="id", help="profile field copied into each result")
+    parser.add_argument("--catalog", help="catalog file or directory (default: built-in schemes)")
+    args = parser.parse_args(argv)
+
+    if args.catalog:
+        import schemes_data
+        from catalog_loader import load_catalog
+        schemes_data.set_catalog(load_catalog(args.catalog))
+
+    def progress(rows, elapsed):
+        print(f"\r[Bulk] {rows} rows, {rows / elapsed if elapsed else 0:,.0f} rows/sec", end="", flush=True)
+
+    stats = screen_file(args.input, args.output, workers=args.workers, chunk_rows=args.chunk_rows,
+                        id_field=args.id_field, progress=progress)
+    print(f"\n[Bulk] Screened {stats['rows']} rows against {stats['schemes']} schemes in "
+          f"{stats['seconds']}s ({stats['rows_per_sec']:,} rows/sec) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+SevaSetu — Caches
+Small thread-safe LRU cache with TTL expiry, version-based invalidation and
+hit/miss counters, shared by the services that memoise expensive results.
+SQLiteCache persists JSON values across restarts and between the worker
+processes of one host; TieredCache puts an LRUCache in front of it.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache.
+
+    Entries expire after ttl seconds (None = never). An entry stored with a
+    version is treated as a miss, and dropped, when it is read with a different
+    version — e.g. the catalog generation it was computed from.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = None, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    def get(self, key, default=None, version=None):
+        """Return the cached value, or default on a miss."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, entry_version, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return default
+            if entry_version != version:
+                del self._data[key]
+                self.invalidated += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version=None, ttl: float = None):
+        """Store a value, evicting the least recently used entry when full; ttl overrides self.ttl."""
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        """Drop an entry if present (e.g. after its source changed)."""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidated += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Counters for sizing the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+        }
+
+
+class SQLiteCache:
+    """
+    Persistent key -> JSON value store in a SQLite file.
+
+    Entries expire after ttl seconds of wall-clock time (None = never). When
+    the table grows past maxsize, the oldest entries are dropped. WAL mode
+    lets several worker processes share the file.
+    """
+
+    def __init__(self, path: str, maxsize: int = 100_000, ttl: float = None, name: str = "sqlite"):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.errors = 0
+        self._writes = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, expires REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_created ON entries (created)")
+
+    def get(self, key: str, default=None):
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def get_entry(self, key: str):
+        """(value, seconds until it expires or None), or None on a miss."""
+        try:
+            with self._lock:
+                row = self._db.execute("SELECT value, expires FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                value, expires = row
+                now = time.time()
+                if expires is not None and expires <= now:
+                    self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self.expired += 1
+                    self.misses += 1
+                    return None
+                self.hits += 1
+            return json.loads(value), (expires - now if expires is not None else None)
+        except (sqlite3.Error, ValueError) as e:
+            self.errors += 1
+            print(f"[Cache] {self.name} read failed: {e}")
+            return None
+
+    def set(self, key: str, value):
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        try:
+            payload = json.dumps(value, ensure_ascii=False)
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, created, expires) VALUES (?, ?, ?, ?)",
+                    (key, payload, now, expires),
+                )
+                self._writes += 1
+                # Checking the size on every write would cost a COUNT(*) each time
+                if self._writes % 100 == 0:
+                    self._trim()
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            self.errors += 1
+            print(f"[Cache] {self.name} write failed: {e}")
+
+    def _trim(self):
+        self._db.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.maxsize:
+            excess = count - self.maxsize
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY created LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "path": self.path,
+            "size": len(self),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "errors": self.errors,
+        }
+
+
+class TieredCache:
+    """
+    An in-process LRUCache in front of an optional persistent SQLiteCache.
+    A disk hit is copied to memory for no longer than it has left on disk.
+    """
+
+    def __init__(self, memory: LRUCache, disk: SQLiteCache = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str, default=None):
+        value = self.memory.get(key)
+        if value is None:
+            value = self.load(key)
+        return default if value is None else value
+
+    def load(self, key: str):
+        """Disk tier lookup (blocking), promoting a hit to memory; None on a miss."""
+        if self.disk is None:
+            return None
+        entry = self.disk.get_entry(key)
+        if entry is None:
+            return None
+        value, remaining = entry
+        if remaining is not None and self.memory.ttl:
+            remaining = min(remaining, self.memory.ttl)
+        self.memory.set(key, value, ttl=remaining)
+        return value
+
+    def set(self, key: str, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None,
+        }
@@ -0,0 +1,205 @@
+"""
+SevaSetu — External Scheme Catalog Loader
+Loads the scheme catalog from a JSON/JSONL file or a directory of them,
+validates it, and hot-swaps it into the running service.
+
+Set SEVASETU_CATALOG_PATH to enable. A file may hold a JSON list of schemes,
+an object with a "schemes" list, or one scheme per line (.jsonl). A directory
+is read in file-name order. Without the variable the built-in
+schemes_data.SCHEMES are used.
+
+Reloads are triggered by POST /admin/catalog/reload or by the background
+watcher (SEVASETU_CATALOG_POLL_SECONDS, 0 disables). The new catalog and its
+search index are built off to the side and swapped in together; requests in
+flight keep using the generation they started with.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import eligibility_engine
+import eligibility_matrix
+import rule_tree
+import vector_store
+from schemes_data import SchemeCatalog, get_catalog
+
+CATALOG_PATH = os.getenv("SEVASETU_CATALOG_PATH", "")
+POLL_SECONDS = float(os.getenv("SEVASETU_CATALOG_POLL_SECONDS", "10"))
+
+REQUIRED_FIELDS = ("scheme_id", "name", "short_name", "category", "description",
+                   "benefits", "state", "required_documents", "eligibility_rules")
+
+_reload_lock = threading.Lock()
+_watcher = None
+_last_signature = None
+
+
+class CatalogError(ValueError):
+    """Raised when a catalog file cannot be read or fails validation."""
+
+
+def _catalog_files(path: str) -> list:
+    if os.path.isdir(path):
+        return [
+            os.path.join(path, name) for name in sorted(os.listdir(path))
+            if name.endswith((".json", ".jsonl")) and not name.startswith(".")
+        ]
+    if os.path.isfile(path):
+        return [path]
+    raise CatalogError(f"Catalog path '{path}' does not exist")
+
+
+def _signature(path: str) -> tuple:
+    """Cheap change detector: (file, mtime, size) of every catalog file."""
+    signature = []
+    for file_path in _catalog_files(path):
+        stat = os.stat(file_path)
+        signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _read_file(file_path: str) -> list:
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            if file_path.endswith(".jsonl"):
+                return [json.loads(line) for line in f if line.strip()]
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise CatalogError(f"{file_path}: {e}")
+    if isinstance(data, dict):
+        data = data.get("schemes")
+    if not isinstance(data, list):
+        raise CatalogError(f"{file_path}: expected a list of schemes or {{\"schemes\": [...]}}")
+    return data
+
+
+def validate_schemes(schemes: list) -> list:
+    """Return a list of human-readable problems (empty when the catalog is valid)."""
+    problems = []
+    seen = set()
+    for i, scheme in enumerate(schemes):
+        where = f"scheme #{i} ({scheme.get('scheme_id', '?') if isinstance(scheme, dict) else '?'})"
+        if not isinstance(scheme, dict):
+            problems.append(f"{where}: not an object")
+            continue
+        missing = [f for f in REQUIRED_FIELDS if f not in scheme]
+        if missing:
+            problems.append(f"{where}: missing {', '.join(missing)}")
+            continue
+        if scheme["scheme_id"] in seen:
+            problems.append(f"{where}: duplicate scheme_id")
+        seen.add(scheme["scheme_id"])
+        if not isinstance(scheme["required_documents"], list):
+            problems.append(f"{where}: required_documents must be a list")
+
+        eligibility = scheme["eligibility_rules"]
+        if not isinstance(eligibility, dict) or not isinstance(eligibility.get("rules"), list):
+            problems.append(f"{where}: eligibility_rules must have a rules list")
+            continue
+        problems.extend(rule_tree.validate(eligibility, where, "eligibility_rules"))
+    return problems
+
+
+def load_catalog(path: str) -> SchemeCatalog:
+    """Read, validate and compile a catalog without installing it."""
+    schemes = []
+    for file_path in _catalog_files(path):
+        schemes.extend(_read_file(file_path))
+
+    problems = validate_schemes(schemes)
+    if problems:
+        shown = "; ".join(problems[:10])
+        more = f" (+{len(problems) - 10} more)" if len(problems) > 10 else ""
+        raise CatalogError(f"Invalid catalog {path}: {shown}{more}")
+
+    content_hash = hashlib.sha256(
+        json.dumps(schemes, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    return SchemeCatalog(schemes, source=path, content_hash=content_hash)
+
+
+def _prebuild(catalog: SchemeCatalog):
+    """
+    Build the eligibility data derived from a catalog before it goes live, so
+    the first request after a swap does not pay for it on the event loop.
+    """
+    eligibility_engine.compiled_schemes(catalog)
+    eligibility_engine.alternatives_index(catalog)
+    eligibility_matrix.rule_columns(catalog)
+
+
+def reload_catalog(path: str = None, force: bool = False) -> dict:
+    """
+    Load the catalog at path (default SEVASETU_CATALOG_PATH) and swap it in
+    together with a matching search index. Unchanged content is a no-op unless
+    force is set. Raises CatalogError on invalid input; the live catalog is
+    left untouched in that case.
+    """
+    global _last_signature
+    path = path or CATALOG_PATH
+    if not path:
+        raise CatalogError("No catalog path configured (set SEVASETU_CATALOG_PATH)")
+
+    with _reload_lock:
+        # Recorded before validation so the watcher retries only after the files change again
+        _last_signature = _signature(path)
+        catalog = load_catalog(path)
+        if not force and get_catalog().content_hash == catalog.content_hash:
+            return {"status": "unchanged", **catalog_status()}
+
+        _prebuild(catalog)
+        gen = vector_store.build_index(catalog=catalog)
+        print(f"[Catalog] Loaded {len(catalog)} schemes from {path} -> index generation {gen.number}")
+        return {"status": "reloaded", **catalog_status()}
+
+
+def catalog_status() -> dict:
+    catalog = get_catalog()
+    return {
+        "source": catalog.source,
+        "schemes": len(catalog),
+        "content_hash": catalog.content_hash,
+        "index_generation": vector_store.current_generation().number,
+    }
+
+
+def _watch(path: str, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            if _signature(path) != _last_signature:
+                reload_catalog(path)
+        except CatalogError as e:
+            print(f"[Catalog] Reload skipped, keeping current catalog: {e}")
+        except Exception as e:
+            print(f"[Catalog] Watcher error: {e}")
+
+
+def start_watcher(path: str = None, interval: float = None) -> threading.Event:
+    """Poll the catalog files for changes in a daemon thread. Returns its stop event."""
+    global _watcher
+    path = path or CATALOG_PATH
+    interval = POLL_SECONDS if interval is None else interval
+    if not path or interval <= 0 or _watcher is not None:
+        return None
+    stop = threading.Event()
+    _watcher = stop
+    threading.Thread(target=_watch, args=(path, interval, stop), daemon=True, name="catalog-watcher").start()
+    print(f"[Catalog] Watching {path} every {interval:g}s")
+    return stop
+
+
+def init_catalog():
+    """Startup: install the external catalog if configured, else the built-in one."""
+    if not CATALOG_PATH:
+        _prebuild(get_catalog())
+        vector_store.build_index()
+        return
+    try:
+        reload_catalog(CATALOG_PATH, force=True)
+    except CatalogError as e:
+        print(f"[Catalog] {e}. Falling back to built-in schemes.")
+        _prebuild(get_catalog())
+        vector_store.build_index()
+    start_watcher()
@@ -0,0 +1,228 @@
+"""
+SevaSetu — Document Storage
+Streams uploaded files to S3 or local disk in fixed-size chunks.
+
+An upload is never held in memory whole: chunks are read from the request
+and handed to a writer, which appends them to a local file or, for S3,
+collects them into multipart-upload parts. The size cap is enforced as the
+bytes arrive, and every blocking file or S3 call runs in a worker thread so
+the event loop keeps serving other requests.
+
+Stored objects are content-addressed: each upload is SHA-256 hashed while
+it streams and kept once under its hash (uploads/blobs/<hash> or
+s3://.../documents/sha256/<hash>). Re-uploading the same bytes, by anyone,
+stores nothing new; document records are the per-user references to it.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import uuid
+
+from botocore.exceptions import ClientError
+
+from aws_config import get_s3_client, is_aws_available, S3_BUCKET_DOCUMENTS
+
+UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+os.makedirs(BLOB_DIR, exist_ok=True)
+S3_BLOB_PREFIX = "documents/sha256/"
+S3_STAGING_PREFIX = "documents/staging/"
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024)
+CHUNK_BYTES = 1024 * 1024
+# S3's minimum part size (except the last); bigger parts mean fewer requests
+S3_PART_BYTES = max(5, int(os.getenv("S3_PART_MB", "5"))) * 1024 * 1024
+# A part being collected stays in memory up to this size, then spills to a temp file
+S3_SPOOL_BYTES = CHUNK_BYTES
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeded MAX_UPLOAD_BYTES."""
+
+
+class LocalWriter:
+    """Appends chunks to a .part file and renames it to its content path on commit."""
+
+    location = "local"
+
+    def __init__(self):
+        self.partial = os.path.join(BLOB_DIR, f"{uuid.uuid4()}.part")
+        self.file = open(self.partial, "wb")
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+
+    def commit(self, path: str) -> bool:
+        """Move the data to path; returns True if identical content was already stored there."""
+        self.file.close()
+        if os.path.exists(path):
+            os.remove(self.partial)
+            return True
+        os.replace(self.partial, path)
+        return False
+
+    def abort(self):
+        self.file.close()
+        try:
+            os.remove(self.partial)
+        except FileNotFoundError:
+            pass
+
+
+class S3MultipartWriter:
+    """
+    Buffers chunks into S3_PART_BYTES parts of a multipart upload under a
+    staging key, then copies it to its content key on commit. Uploads that
+    fit in a single part are sent with one put_object straight to their
+    content key. The part being collected is spooled: at most S3_SPOOL_BYTES
+    of it is held in memory, the rest in a temp file.
+    """
+
+    location = "s3"
+
+    def __init__(self, content_type: str):
+        self.s3 = get_s3_client()
+        self.key = f"{S3_STAGING_PREFIX}{uuid.uuid4()}"
+        self.content_type = content_type
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=S3_SPOOL_BYTES)
+        self.buffered = 0
+        self.upload_id = None
+        self.parts = []
+
+    def write(self, chunk: bytes):
+        self.buffer.write(chunk)
+        self.buffered += len(chunk)
+        if self.buffered >= S3_PART_BYTES:
+            self._upload_part()
+
+    def _rewind(self):
+        self.buffer.seek(0)
+        return self.buffer
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            self.upload_id = self.s3.create_multipart_upload(
+                Bucket=S3_BUCKET_DOCUMENTS, Key=self.key, ContentType=self.content_type,
+            )["UploadId"]
+        number = len(self.parts) + 1
+        response = self.s3.upload_part(
+            Bucket=S3_BUCKET_DOCUMENTS, Key=self.key, UploadId=self.upload_id,
+            PartNumber=number, Body=self._rewind(),
+        )
+        self.parts.append({"PartNumber": number, "ETag": response["ETag"]})
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.buffered = 0
+
+    def _exists(self, key: str) -> bool:
+        try:
+            self.s3.head_object(Bucket=S3_BUCKET_DOCUMENTS, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def commit(self, key: str) -> bool:
+        """Store the data at key; returns True if identical content was already stored there."""
+        if self._exists(key):
+            self.abort()
+            return True
+        if self.upload_id is None:
+            self.s3.put_object(
+                Bucket=S3_BUCKET_DOCUMENTS, Key=key, Body=self._rewind(), ContentType=self.content_type,
+            )
+            self.buffer.close()
+            return False
+        if self.buffered:
+            self._upload_part()
+        self.buffer.close()
+        self.s3.complete_multipart_upload(
+            Bucket=S3_BUCKET_DOCUMENTS, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": self.parts},
+        )
+        self.s3.copy_object(
+            Bucket=S3_BUCKET_DOCUMENTS, Key=key, CopySource={"Bucket": S3_BUCKET_DOCUMENTS, "Key": self.key},
+        )
+        self.s3.delete_object(Bucket=S3_BUCKET_DOCUMENTS, Key=self.key)
+        return False
+
+    def abort(self):
+        self.buffer.close()
+        if self.upload_id is not None:
+            try:
+                self.s3.abort_multipart_upload(Bucket=S3_BUCKET_DOCUMENTS, Key=self.key, UploadId=self.upload_id)
+            except Exception as e:
+                print(f"[Storage] Could not abort multipart upload {self.key}: {e}")
+
+
+def _write(writer, digest, chunk: bytes):
+    digest.update(chunk)
+    writer.write(chunk)
+
+
+async def _stream(file, writer, max_bytes: int, destination) -> dict:
+    """
+    Copy an UploadFile into writer chunk by chunk, hashing it on the way,
+    then commit it to destination(content_hash).
+    """
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        while True:
+            chunk = await file.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+            await asyncio.to_thread(_write, writer, digest, chunk)
+        content_hash = digest.hexdigest()
+        key = destination(content_hash)
+        existed = await asyncio.to_thread(writer.commit, key)
+    except BaseException:
+        await asyncio.to_thread(writer.abort)
+        raise
+    return {"storage": writer.location, "storage_key": key, "size_bytes": size,
+            "content_hash": content_hash, "deduplicated": existed}
+
+
+async def store_upload(file, max_bytes: int = MAX_UPLOAD_BYTES) -> dict:
+    """
+    Stream an UploadFile to S3 (multipart) or, if AWS is unavailable or the
+    S3 upload fails, to local disk, stored once per distinct content.
+
+    Returns:
+        dict with storage ("s3" or "local"), storage_key, size_bytes,
+        content_hash (SHA-256 hex) and deduplicated (the content was
+        already stored)
+
+    Raises:
+        UploadTooLarge: the file is larger than max_bytes
+    """
+    if is_aws_available():
+        try:
+            writer = await asyncio.to_thread(S3MultipartWriter, file.content_type or "application/octet-stream")
+            stored = await _stream(file, writer, max_bytes, lambda h: S3_BLOB_PREFIX + h)
+            print(f"[Storage] {'Already in' if stored['deduplicated'] else 'Uploaded to'} S3: "
+                  f"{stored['storage_key']} ({stored['size_bytes']} bytes)")
+            return stored
+        except UploadTooLarge:
+            raise
+        except Exception as e:
+            print(f"[Storage] S3 upload failed, using local: {e}")
+            await file.seek(0)  # the request body is spooled, so it can be replayed
+
+    writer = await asyncio.to_thread(LocalWriter)
+    return await _stream(file, writer, max_bytes, lambda h: os.path.join(BLOB_DIR, h))
+
+
+def read_document(storage: str, storage_key: str) -> bytes:
+    """Blocking read of a stored document's bytes (for OCR backends)."""
+    if storage == "s3":
+        response = get_s3_client().get_object(Bucket=S3_BUCKET_DOCUMENTS, Key=storage_key)
+        return response["Body"].read()
+    with open(storage_key, "rb") as f:
+        return f.read()
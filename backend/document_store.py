@@ -0,0 +1,258 @@
+"""
+SevaSetu — Document Metadata Store
+Persistent record of every uploaded document, shared by all API workers.
+
+Documents are keyed by document_id and indexed by user_id, so a lookup by
+id or by user touches only the matching records. Backends:
+  - DynamoDB (DYNAMO_TABLE_DOCUMENTS, with a "user_id-index" GSI on
+    user_id + uploaded_at), used when AWS is configured
+  - SQLite (DOCUMENT_DB_PATH, default uploads/documents.sqlite3 next to the
+    local files), used otherwise; WAL mode lets the workers share it
+DOCUMENT_STORE=sqlite|dynamodb forces one. Lookups by id are served from an
+in-process LRU for DOCUMENT_CACHE_TTL seconds, so a change made by another
+worker becomes visible within that time.
+
+update_document() is an atomic read-merge-write (one BEGIN IMMEDIATE
+transaction on SQLite, a conditional update on DynamoDB). With
+expected_job_id it only applies while the record still carries that OCR
+job, so workers racing to queue or finish a job cannot overwrite each other.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from aws_config import get_dynamodb_resource, is_aws_available
+from cache import LRUCache
+from document_storage import UPLOAD_DIR
+
+DOCUMENT_STORE = os.getenv("DOCUMENT_STORE", "auto").lower()
+DOCUMENT_DB_PATH = os.getenv("DOCUMENT_DB_PATH", os.path.join(UPLOAD_DIR, "documents.sqlite3"))
+DYNAMO_TABLE_DOCUMENTS = os.getenv("DYNAMO_TABLE_DOCUMENTS", "sevasetu-documents")
+USER_INDEX = "user_id-index"
+
+# expected_job_id default: update whatever job the record has
+ANY_JOB = object()
+# Attempts at a DynamoDB conditional update before giving up on a busy record
+DYNAMO_UPDATE_ATTEMPTS = 5
+
+_cache = LRUCache(
+    maxsize=int(os.getenv("DOCUMENT_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("DOCUMENT_CACHE_TTL", "30")),
+    name="documents",
+)
+
+
+class JobChanged(RuntimeError):
+    """The record's OCR job is not the one the update expected; .doc is the current record."""
+
+    def __init__(self, doc: dict):
+        super().__init__(f"Document {doc['document_id']} has OCR job {_job_id(doc)}")
+        self.doc = doc
+
+
+def _job_id(doc: dict):
+    return (doc.get("ocr_job") or {}).get("job_id")
+
+
+def _merge(doc: dict, fields: dict, expected_job_id) -> dict:
+    if expected_job_id is not ANY_JOB and _job_id(doc) != expected_job_id:
+        raise JobChanged(doc)
+    return {**doc, **fields}
+
+
+class SQLiteDocumentStore:
+    """documents table with a (user_id, uploaded_at) index; records are stored as JSON."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "document_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, uploaded_at TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS documents_user ON documents (user_id, uploaded_at)")
+
+    def put(self, doc: dict):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents (document_id, user_id, uploaded_at, data) VALUES (?, ?, ?, ?)",
+                (doc["document_id"], doc["user_id"], doc["uploaded_at"], json.dumps(doc, ensure_ascii=False)),
+            )
+
+    def get(self, document_id: str):
+        with self._lock:
+            row = self._db.execute("SELECT data FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, document_id: str, fields: dict, expected_job_id=ANY_JOB):
+        """Read, merge and write back in one write transaction (other workers wait on it)."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT data FROM documents WHERE document_id = ?", (document_id,)).fetchone()
+                doc = _merge(json.loads(row[0]), fields, expected_job_id) if row else None
+                if doc is not None:
+                    self._db.execute("UPDATE documents SET data = ? WHERE document_id = ?",
+                                     (json.dumps(doc, ensure_ascii=False), document_id))
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        return doc
+
+    def for_user(self, user_id: str) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM documents WHERE user_id = ? ORDER BY uploaded_at", (user_id,)
+            ).fetchall()
+        return [json.loads(data) for (data,) in rows]
+
+
+class DynamoDocumentStore:
+    """
+    One item per document. The record is kept as a JSON string (like the
+    workflow sessions), so nested OCR output needs no Decimal conversion.
+    """
+
+    name = "dynamodb"
+
+    def __init__(self, table_name: str):
+        self.table = get_dynamodb_resource().Table(table_name)
+        self.table.load()  # fails fast if the table is missing
+
+    def put(self, doc: dict):
+        item = {
+            "document_id": doc["document_id"],
+            "user_id": doc["user_id"],
+            "uploaded_at": doc["uploaded_at"],
+            "data": json.dumps(doc, ensure_ascii=False),
+        }
+        if _job_id(doc):
+            item["ocr_job_id"] = _job_id(doc)  # top-level copy for conditional updates
+        self.table.put_item(Item=item)
+
+    def get(self, document_id: str, consistent: bool = False):
+        item = self.table.get_item(Key={"document_id": document_id}, ConsistentRead=consistent).get("Item")
+        return json.loads(item["data"]) if item else None
+
+    def update(self, document_id: str, fields: dict, expected_job_id=ANY_JOB):
+        """
+        Merge and write back only if the record still has the OCR job it was
+        read with (ocr_job_id condition); retried when another writer got there first.
+        """
+        from botocore.exceptions import ClientError
+
+        for _ in range(DYNAMO_UPDATE_ATTEMPTS):
+            current = self.get(document_id, consistent=True)
+            if current is None:
+                return None
+            doc = _merge(current, fields, expected_job_id)
+            values = {":data": json.dumps(doc, ensure_ascii=False)}
+            if _job_id(current):
+                condition = "ocr_job_id = :seen"
+                values[":seen"] = _job_id(current)
+            else:
+                condition = "attribute_not_exists(ocr_job_id)"
+            if _job_id(doc):
+                expression = "SET #data = :data, ocr_job_id = :job"
+                values[":job"] = _job_id(doc)
+            else:
+                expression = "SET #data = :data REMOVE ocr_job_id"
+            try:
+                self.table.update_item(
+                    Key={"document_id": document_id},
+                    UpdateExpression=expression,
+                    ConditionExpression=f"attribute_exists(document_id) AND {condition}",
+                    ExpressionAttributeNames={"#data": "data"},
+                    ExpressionAttributeValues=values,
+                )
+                return doc
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
+        raise RuntimeError(f"Document {document_id} kept changing; update abandoned")
+
+    def for_user(self, user_id: str) -> list:
+        from boto3.dynamodb.conditions import Key
+
+        query = {"IndexName": USER_INDEX, "KeyConditionExpression": Key("user_id").eq(user_id)}
+        docs = []
+        while True:
+            page = self.table.query(**query)
+            docs.extend(json.loads(item["data"]) for item in page.get("Items", []))
+            if "LastEvaluatedKey" not in page:
+                return docs
+            query["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _get_store():
+    """Opened on first use: DynamoDB when configured and reachable, else SQLite."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _open_store()
+    return _store
+
+
+def _open_store():
+    if DOCUMENT_STORE == "dynamodb" or (DOCUMENT_STORE == "auto" and is_aws_available()):
+        try:
+            store = DynamoDocumentStore(DYNAMO_TABLE_DOCUMENTS)
+            print(f"[Documents] Using DynamoDB table: {DYNAMO_TABLE_DOCUMENTS}")
+            return store
+        except Exception as e:
+            print(f"[Documents] DynamoDB unavailable, using SQLite: {e}")
+    print(f"[Documents] Using SQLite store: {DOCUMENT_DB_PATH}")
+    return SQLiteDocumentStore(DOCUMENT_DB_PATH)
+
+
+def put_document(doc: dict):
+    """Insert or replace a document record (needs document_id, user_id, uploaded_at)."""
+    _get_store().put(doc)
+    _cache.set(doc["document_id"], doc)
+
+
+def get_document(document_id: str, fresh: bool = False):
+    """Document record by id, or None. fresh skips the read cache (e.g. to follow another worker's job)."""
+    doc = None if fresh else _cache.get(document_id)
+    if doc is None:
+        doc = _get_store().get(document_id)
+        if doc is not None:
+            _cache.set(document_id, doc)
+    return doc
+
+
+def update_document(document_id: str, expected_job_id=ANY_JOB, **fields):
+    """
+    Atomically merge fields into a stored record; returns the updated record,
+    or None if unknown. With expected_job_id (None = no job yet) raises
+    JobChanged if the record's OCR job is a different one.
+    """
+    try:
+        return _get_store().update(document_id, fields, expected_job_id)
+    finally:
+        _cache.discard(document_id)
+
+
+def documents_for_user(user_id: str) -> list:
+    """All of a user's document records, oldest first (served by the user_id index)."""
+    docs = _get_store().for_user(user_id)
+    docs.sort(key=lambda d: d.get("uploaded_at", ""))
+    return docs
+
+
+def stats() -> dict:
+    return {"backend": _get_store().name, "cache": _cache.stats()}
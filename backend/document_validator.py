@@ -3,6 +3,7 @@ SevaSetu — Document Validator
 Cross-document mismatch detection using fuzzy string matching.
 """
 
+import asyncio
 from fuzzywuzzy import fuzz
 from ocr_engine import get_all_documents_for_user
 
@@ -60,7 +61,7 @@ async def validate_documents(user_id: str = "demo-user", documents_data: list =
     if documents_data:
         docs = documents_data
     else:
-        stored = get_all_documents_for_user(user_id)
+        stored = await asyncio.to_thread(get_all_documents_for_user, user_id)
         docs = [
             {"document_type": d["document_type"], "extracted_data": d["extracted_data"]}
             for d in stored
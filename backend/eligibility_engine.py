@@ -2,153 +2,568 @@
 SevaSetu — Rule-Based Eligibility Engine
 Deterministic validation of user profiles against scheme rules.
 All decisions are explainable with human-readable reasons.
+
+Rules may be nested AND/OR/NOT trees (see rule_tree). They are compiled once
+per catalog into predicate closures with their thresholds already converted;
+evaluation short-circuits, trying the cheapest, most often decisive rules
+first. Every rule is only evaluated, and human-readable messages rendered,
+when a caller asks for an explanation.
+
+Results are memoised under the profile projected onto the fields the scheme's
+rules read (alternatives: the fields any rule reads), tagged with the catalog
+version, so checks that differ only in irrelevant fields skip evaluation.
 """
 
-from schemes_data import get_scheme_by_id, get_all_schemes
+import heapq
+import json
+import operator as op
+import os
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+import rule_tree
+from cache import LRUCache
+from schemes_data import get_catalog
+
+PASS, FAIL, UNKNOWN = "pass", "fail", "unknown"
+
+NUMERIC_OPERATORS = {"gt": op.gt, "gte": op.ge, "lt": op.lt, "lte": op.le}
+
+# Relative cost of evaluating a rule; numeric rules convert the profile value
+RULE_COSTS = {"eq": 1.0, "neq": 1.0, "in": 1.2, "not_in": 1.2, "gt": 1.5, "gte": 1.5, "lt": 1.5, "lte": 1.5}
+REORDER_EVERY = 256
+
+ALTERNATIVE_MIN_RATIO = 0.3  # At least 30% rules match
+
+_result_cache = LRUCache(
+    maxsize=int(os.getenv("ELIGIBILITY_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("ELIGIBILITY_CACHE_TTL", "0")),
+    name="eligibility",
+)
+_alternatives_cache = LRUCache(
+    maxsize=int(os.getenv("ELIGIBILITY_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("ELIGIBILITY_CACHE_TTL", "0")),
+    name="eligibility_alternatives",
+)
+
+
+def _membership(expected, negate: bool):
+    """Predicate for in / not_in; hashable lists become a frozenset lookup."""
+    values = expected
+    if isinstance(expected, (list, tuple, set)):
+        try:
+            values = frozenset(expected)
+        except TypeError:
+            pass
+
+    def test(actual):
+        try:
+            found = actual in values
+        except TypeError:  # unhashable actual value
+            found = actual in expected
+        return found != negate
+
+    return test
+
+
+def _number(value):
+    """value as a float, or None when it cannot be parsed (treated as unknown)."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number  # NaN
+
+
+def _numeric(compare, threshold: float):
+    def test(actual):
+        value = _number(actual)
+        return None if value is None else compare(value, threshold)
+
+    return test
+
+
+def _predicate(operator: str, expected):
+    """Build actual -> bool for one rule; numeric rules give None for unparseable values."""
+    if operator == "eq":
+        return lambda actual: actual == expected
+    if operator == "neq":
+        return lambda actual: actual != expected
+    if operator in NUMERIC_OPERATORS:
+        return _numeric(NUMERIC_OPERATORS[operator], float(expected))
+    if operator == "in":
+        return _membership(expected, negate=False)
+    if operator == "not_in":
+        return _membership(expected, negate=True)
+    return lambda actual: False
+
+
+class _Node:
+    """Shared bookkeeping: relative cost and observed outcomes, used to order siblings."""
+
+    __slots__ = ("cost", "seen", "passed", "failed")
+
+    def _record(self, status: str) -> str:
+        self.seen += 1
+        if status is PASS:
+            self.passed += 1
+        elif status is FAIL:
+            self.failed += 1
+        return status
+
+    def pass_rate(self) -> float:
+        return (self.passed + 1) / (self.seen + 2)
+
+    def fail_rate(self) -> float:
+        return (self.failed + 1) / (self.seen + 2)
 
 
-def _evaluate_rule(rule: dict, user_profile: dict) -> dict:
-    """Evaluate a single rule against user profile."""
-    field = rule["field"]
-    operator = rule["operator"]
-    expected = rule["value"]
-    label = rule.get("label", f"{field} {operator} {expected}")
+class CompiledRule(_Node):
+    """One eligibility rule with its predicate prepared."""
 
-    actual = user_profile.get(field)
+    __slots__ = ("field", "operator", "expected", "label", "test")
 
-    # If field not provided, mark as unknown
-    if actual is None:
+    def __init__(self, rule: dict):
+        self.field = rule["field"]
+        self.operator = rule["operator"]
+        self.expected = rule["value"]
+        self.label = rule.get("label", f"{self.field} {self.operator} {self.expected}")
+        self.test = _predicate(self.operator, self.expected)
+        self.cost = RULE_COSTS.get(self.operator, 1.0)
+        self.seen = self.passed = self.failed = 0
+
+    def status(self, user_profile: dict) -> str:
+        actual = user_profile.get(self.field)
+        if actual is None:
+            return UNKNOWN
+        passed = self.test(actual)
+        if passed is None:
+            return UNKNOWN
+        return PASS if passed else FAIL
+
+    def evaluate(self, user_profile: dict) -> str:
+        return self._record(self.status(user_profile))
+
+    def explain(self, user_profile: dict) -> dict:
+        """Full per-rule result with a human-readable message."""
+        actual = user_profile.get(self.field)
+
+        # If field not provided, mark as unknown
+        if actual is None:
+            return {
+                "field": self.field,
+                "rule": self.label,
+                "status": UNKNOWN,
+                "message": f"Information about '{self.field}' was not provided. Please provide this detail.",
+                "required_value": str(self.expected),
+                "actual_value": None,
+            }
+
+        passed = self.test(actual)
+        if passed is None:
+            return {
+                "field": self.field,
+                "rule": self.label,
+                "status": UNKNOWN,
+                "message": f"'{self.field}' must be a number (your value: {actual}). Please correct this detail.",
+                "required_value": str(self.expected),
+                "actual_value": str(actual),
+            }
         return {
-            "field": field,
-            "rule": label,
-            "status": "unknown",
-            "message": f"Information about '{field}' was not provided. Please provide this detail.",
-            "required_value": str(expected),
-            "actual_value": None,
+            "field": self.field,
+            "rule": self.label,
+            "status": PASS if passed else FAIL,
+            "message": f"✅ {self.label}" if passed else f"❌ {self.label} (your value: {actual})",
+            "required_value": str(self.expected),
+            "actual_value": str(actual),
         }
 
-    # Evaluate based on operator
-    passed = False
-    if operator == "eq":
-        passed = actual == expected
-    elif operator == "neq":
-        passed = actual != expected
-    elif operator == "gt":
-        passed = float(actual) > float(expected)
-    elif operator == "gte":
-        passed = float(actual) >= float(expected)
-    elif operator == "lt":
-        passed = float(actual) < float(expected)
-    elif operator == "lte":
-        passed = float(actual) <= float(expected)
-    elif operator == "in":
-        passed = actual in expected
-    elif operator == "not_in":
-        passed = actual not in expected
 
-    return {
-        "field": field,
-        "rule": label,
-        "status": "pass" if passed else "fail",
-        "message": f"✅ {label}" if passed else f"❌ {label} (your value: {actual})",
-        "required_value": str(expected),
-        "actual_value": str(actual),
-    }
+class CompiledGroup(_Node):
+    """
+    AND/OR over child nodes with three-valued (pass/fail/unknown) logic.
+
+    evaluate() stops at the first decisive child (FAIL for AND, PASS for OR).
+    Children are tried cheapest-per-decision first: every REORDER_EVERY
+    evaluations they are re-sorted by cost / observed decisive rate.
+    """
+
+    __slots__ = ("logic", "label", "children", "order")
+
+    def __init__(self, node: dict):
+        self.logic = node["logic"]
+        self.label = node.get("label")
+        self.children = [
+            CompiledGroup(child) if rule_tree.is_group(child) else CompiledRule(child)
+            for child in node["rules"]
+        ]
+        self.cost = sum(child.cost for child in self.children)
+        self.seen = self.passed = self.failed = 0
+        self.order = sorted(self.children, key=lambda child: child.cost)
+
+    def evaluate(self, user_profile: dict) -> str:
+        if self.logic == "AND":
+            status = PASS
+            for child in self.order:
+                outcome = child.evaluate(user_profile)
+                if outcome is FAIL:
+                    status = FAIL
+                    break
+                if outcome is UNKNOWN:
+                    status = UNKNOWN
+        else:  # OR
+            status = FAIL
+            for child in self.order:
+                outcome = child.evaluate(user_profile)
+                if outcome is PASS:
+                    status = PASS
+                    break
+                if outcome is UNKNOWN:
+                    status = UNKNOWN
+        if self.seen % REORDER_EVERY == REORDER_EVERY - 1:
+            self._reorder()
+        return self._record(status)
+
+    def _reorder(self):
+        rate = _Node.fail_rate if self.logic == "AND" else _Node.pass_rate
+        # Swapped in as a new list so concurrent evaluations keep a consistent order
+        self.order = sorted(self.children, key=lambda child: child.cost / rate(child))
+
+    def explain(self, user_profile: dict) -> tuple:
+        """Evaluate every child: (status, [(status, leaf result | child explain), ...])."""
+        parts = []
+        for child in self.children:
+            if isinstance(child, CompiledGroup):
+                parts.append(child.explain(user_profile))
+            else:
+                result = child.explain(user_profile)
+                parts.append((result["status"], result))
+        statuses = [status for status, _ in parts]
+        decisive, default = (FAIL, PASS) if self.logic == "AND" else (PASS, FAIL)
+        if decisive in statuses:
+            return decisive, parts
+        return (UNKNOWN if UNKNOWN in statuses else default), parts
+
+
+class CompiledScheme:
+    """A scheme's rule tree, ready to evaluate."""
+
+    __slots__ = ("scheme", "root", "rules", "fields")
+
+    def __init__(self, scheme: dict):
+        self.scheme = scheme
+        self.root = CompiledGroup(rule_tree.normalize(scheme["eligibility_rules"]))
+        self.rules = list(_leaves(self.root))
+        self.fields = tuple(sorted({rule.field for rule in self.rules}))
+
+    def evaluate(self, user_profile: dict) -> str:
+        """Overall pass/fail/unknown, short-circuiting."""
+        return self.root.evaluate(user_profile)
+
+    def counts(self, user_profile: dict) -> tuple:
+        """(passed, failed, unknown) counts over every rule."""
+        passed = failed = unknown = 0
+        for rule in self.rules:
+            status = rule.status(user_profile)
+            if status is PASS:
+                passed += 1
+            elif status is FAIL:
+                failed += 1
+            else:
+                unknown += 1
+        return passed, failed, unknown
+
+
+def _leaves(node):
+    if isinstance(node, CompiledGroup):
+        for child in node.children:
+            yield from _leaves(child)
+    else:
+        yield node
+
 
+def _compile_catalog(catalog) -> dict:
+    compiled = {s["scheme_id"]: CompiledScheme(s) for s in catalog.schemes}
+    print(f"[Eligibility] Compiled rules for {len(compiled)} schemes")
+    return compiled
 
-async def check_eligibility(scheme_id: str, user_profile: dict) -> dict:
+
+def _positions(groups: dict) -> dict:
+    return {key: np.array(rows, dtype=np.int64) for key, rows in groups.items()}
+
+
+class AlternativesIndex:
     """
-    Check if a user is eligible for a specific scheme.
+    Maps a profile value to the schemes whose rules it satisfies, so match
+    ratios are counted from index hits instead of evaluating every rule.
 
-    Returns:
-        Detailed eligibility result with per-rule explanation.
+    Numeric rules are kept as thresholds sorted per (field, operator) and
+    searched with bisect; eq/in rules are hash maps from value to schemes;
+    neq/not_in rules pass for every value except the ones they list.
     """
-    scheme = get_scheme_by_id(scheme_id)
-    if not scheme:
-        return {
-            "error": f"Scheme '{scheme_id}' not found",
-            "is_eligible": False,
-        }
 
-    rules = scheme["eligibility_rules"]["rules"]
-    logic = scheme["eligibility_rules"].get("logic", "AND")
+    def __init__(self, schemes: list):
+        self.scheme_ids = [s["scheme_id"] for s in schemes]
+        self.schemes = schemes
+        self.position = {sid: i for i, sid in enumerate(self.scheme_ids)}
+        rules = [list(rule_tree.leaves(rule_tree.normalize(s["eligibility_rules"]))) for s in schemes]
+        self.totals = np.array([len(scheme_rules) for scheme_rules in rules], dtype=np.float64)
 
-    rule_results = []
-    for rule in rules:
-        result = _evaluate_rule(rule, user_profile)
-        rule_results.append(result)
+        numeric = {}
+        matches, excluded, negated = {}, {}, {}
+        for i, scheme_rules in enumerate(rules):
+            for rule in scheme_rules:
+                field, operator, expected = rule["field"], rule["operator"], rule["value"]
+                if operator in NUMERIC_OPERATORS:
+                    numeric.setdefault((field, operator), []).append((float(expected), i))
+                    continue
+                if operator in ("in", "not_in") and isinstance(expected, (list, tuple, set)):
+                    values = {v for v in expected if _is_hashable(v)}
+                elif _is_hashable(expected):
+                    values = {expected}
+                else:
+                    continue
+                if operator in ("eq", "in"):
+                    for value in values:
+                        matches.setdefault((field, value), []).append(i)
+                elif operator in ("neq", "not_in"):
+                    negated.setdefault(field, []).append(i)
+                    for value in values:
+                        excluded.setdefault((field, value), []).append(i)
+
+        self.thresholds = {}
+        for key, entries in numeric.items():
+            entries.sort()
+            self.thresholds[key] = ([t for t, _ in entries], np.array([i for _, i in entries], dtype=np.int64))
+        self.matches = _positions(matches)
+        self.excluded = _positions(excluded)
+        self.negated = _positions(negated)
+        self.fields = tuple(sorted(
+            {field for field, _ in self.thresholds} | {field for field, _ in matches} | set(negated)
+        ))
+
+    def _numeric_hits(self, field: str, actual, hits: list):
+        value = None
+        for operator in NUMERIC_OPERATORS:
+            entry = self.thresholds.get((field, operator))
+            if entry is None:
+                continue
+            if value is None:
+                value = _number(actual)
+                if value is None:  # unparseable: no numeric rule matches
+                    return
+            thresholds, rows = entry
+            if operator == "lte":    # value <= t
+                hits.append(rows[bisect_left(thresholds, value):])
+            elif operator == "lt":   # value < t
+                hits.append(rows[bisect_right(thresholds, value):])
+            elif operator == "gte":  # value >= t
+                hits.append(rows[:bisect_right(thresholds, value)])
+            else:                    # gt: value > t
+                hits.append(rows[:bisect_left(thresholds, value)])
+
+    def match_counts(self, user_profile: dict) -> np.ndarray:
+        """Number of rules of each scheme that user_profile satisfies."""
+        hits, misses = [], []
+        for field in self.fields:
+            actual = user_profile.get(field)
+            if actual is None:
+                continue
+            self._numeric_hits(field, actual, hits)
+            hashable = _is_hashable(actual)
+            if hashable and (field, actual) in self.matches:
+                hits.append(self.matches[(field, actual)])
+            if field in self.negated:
+                hits.append(self.negated[field])
+                if hashable and (field, actual) in self.excluded:
+                    misses.append(self.excluded[(field, actual)])
+
+        n = len(self.scheme_ids)
+        counts = np.zeros(n, dtype=np.float64)
+        if hits:
+            counts += np.bincount(np.concatenate(hits), minlength=n)
+        if misses:
+            counts -= np.bincount(np.concatenate(misses), minlength=n)
+        return counts
+
+    def top(self, user_profile: dict, exclude_scheme: str = None, max_results: int = 3) -> list:
+        """Best partially matching schemes as (scheme, match_ratio), best first."""
+        counts = self.match_counts(user_profile)
+        ratios = np.divide(counts, self.totals, out=np.zeros_like(counts), where=self.totals > 0)
+        if exclude_scheme in self.position:
+            ratios[self.position[exclude_scheme]] = 0.0
+        rows = np.flatnonzero(ratios > ALTERNATIVE_MIN_RATIO)
+        rounded = np.round(ratios[rows], 2)
+        if len(rows) > max_results:
+            # Only rows tied with or above the k-th best rounded ratio can make the cut
+            cutoff = np.partition(rounded, len(rows) - max_results)[len(rows) - max_results]
+            keep = rounded >= cutoff
+            rows, rounded = rows[keep], rounded[keep]
+        # Same order as sorting by the rounded ratio: ties keep catalog order
+        best = heapq.nlargest(max_results, zip(rounded.tolist(), (-rows).tolist()))
+        best = [-i for _, i in best]
+        return [(self.schemes[i], round(float(ratios[i]), 2)) for i in best]
+
+
+def _is_hashable(value) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def alternatives_index(catalog=None) -> AlternativesIndex:
+    """Alternative-scheme index for a catalog (default: live), built once per catalog."""
+    catalog = catalog or get_catalog()
+    return catalog.derived("alternatives_index", lambda c: AlternativesIndex(c.schemes))
+
+
+def compiled_schemes(catalog=None) -> dict:
+    """scheme_id -> CompiledScheme for a catalog (default: live), compiled once per catalog."""
+    catalog = catalog or get_catalog()
+    return catalog.derived("compiled_rules", _compile_catalog)
+
+
+def _projection(user_profile: dict, fields: tuple) -> str:
+    """The profile reduced to the given fields, as a cache key (missing == None)."""
+    return json.dumps(
+        [[field, user_profile[field]] for field in fields if user_profile.get(field) is not None],
+        default=str,
+    )
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the eligibility result and alternatives caches."""
+    return {"results": _result_cache.stats(), "alternatives": _alternatives_cache.stats()}
+
+
+def clear_cache():
+    _result_cache.clear()
+    _alternatives_cache.clear()
 
-    passed = [r for r in rule_results if r["status"] == "pass"]
-    failed = [r for r in rule_results if r["status"] == "fail"]
-    unknown = [r for r in rule_results if r["status"] == "unknown"]
 
-    if logic == "AND":
-        is_eligible = len(failed) == 0 and len(unknown) == 0
-    else:  # OR
-        is_eligible = len(passed) > 0
+def _collect(part: tuple, wanted: tuple, out: list):
+    """Leaf results under subtrees whose status is in wanted, in declaration order."""
+    status, detail = part
+    if isinstance(detail, dict):
+        if status in wanted:
+            out.append(detail)
+        return
+    for child in detail:
+        if child[0] in wanted:
+            _collect(child, wanted, out)
 
-    # Build explanation
+
+def _explanation(scheme: dict, is_eligible: bool, tree: tuple) -> str:
+    """Explain the outcome using only the rules that decided it."""
     explanation_parts = []
     if is_eligible:
         explanation_parts.append(f"You are eligible for {scheme['name']}!")
+        passed = []
+        _collect(tree, (PASS,), passed)
         for r in passed:
             explanation_parts.append(f"  {r['message']}")
     else:
         explanation_parts.append(f"You may not be eligible for {scheme['name']}.")
-        for r in failed:
-            explanation_parts.append(f"  {r['message']}")
+        blocking = []
+        _collect(tree, (FAIL, UNKNOWN), blocking)
+        for r in blocking:
+            if r["status"] == FAIL:
+                explanation_parts.append(f"  {r['message']}")
+        unknown = [r for r in blocking if r["status"] == UNKNOWN]
         if unknown:
             explanation_parts.append("  Missing information:")
             for r in unknown:
                 explanation_parts.append(f"    - {r['message']}")
+    return "\n".join(explanation_parts)
+
+
+async def check_eligibility(scheme_id: str, user_profile: dict, explain: bool = True) -> dict:
+    """
+    Check if a user is eligible for a specific scheme.
+
+    Args:
+        scheme_id: scheme to check
+        user_profile: user attributes keyed by rule field
+        explain: include per-rule results and a human-readable explanation
+
+    Returns:
+        Eligibility result; detailed per-rule explanation when explain is set.
+    """
+    catalog = get_catalog()
+    compiled = compiled_schemes(catalog).get(scheme_id)
+    if not compiled:
+        return {
+            "error": f"Scheme '{scheme_id}' not found",
+            "is_eligible": False,
+        }
+
+    # Memoised on the fields this scheme's rules read
+    key = (scheme_id, explain, _projection(user_profile, compiled.fields))
+    result = _result_cache.get(key, version=catalog.version)
+    if result is None:
+        result = _evaluate(compiled, user_profile, explain)
+        _result_cache.set(key, result, version=catalog.version)
 
     # Suggest alternatives if not eligible
     alternatives = []
-    if not is_eligible:
-        alternatives = _find_alternatives(user_profile, exclude_scheme=scheme_id)
+    if not result["is_eligible"]:
+        alternatives = _find_alternatives(user_profile, exclude_scheme=scheme_id, catalog=catalog)
+
+    return {**result, "alternatives": alternatives}
+
+
+def _evaluate(compiled: CompiledScheme, user_profile: dict, explain: bool) -> dict:
+    """check_eligibility result for one compiled scheme, without alternatives."""
+    scheme = compiled.scheme
+    if not explain:
+        status = compiled.evaluate(user_profile)
+        return {
+            "scheme_id": scheme["scheme_id"],
+            "scheme_name": scheme["name"],
+            "is_eligible": status is PASS,
+            "status": status,
+            "required_documents": scheme["required_documents"],
+        }
 
+    tree = compiled.root.explain(user_profile)
+    rule_results = []
+    _collect(tree, (PASS, FAIL, UNKNOWN), rule_results)
+    is_eligible = tree[0] is PASS
+    passed = sum(1 for r in rule_results if r["status"] == PASS)
+    failed = sum(1 for r in rule_results if r["status"] == FAIL)
     return {
-        "scheme_id": scheme_id,
+        "scheme_id": scheme["scheme_id"],
         "scheme_name": scheme["name"],
         "is_eligible": is_eligible,
         "rule_results": rule_results,
-        "passed_count": len(passed),
-        "failed_count": len(failed),
-        "unknown_count": len(unknown),
-        "explanation": "\n".join(explanation_parts),
+        "passed_count": passed,
+        "failed_count": failed,
+        "unknown_count": len(rule_results) - passed - failed,
+        "explanation": _explanation(scheme, is_eligible, tree),
         "required_documents": scheme["required_documents"],
-        "alternatives": alternatives,
     }
 
 
-def _find_alternatives(user_profile: dict, exclude_scheme: str = None, max_results: int = 3) -> list:
+def _find_alternatives(user_profile: dict, exclude_scheme: str = None, max_results: int = 3,
+                       catalog=None) -> list:
     """Find alternative schemes that the user might be eligible for."""
-    all_schemes = get_all_schemes()
-    candidates = []
-
-    for scheme in all_schemes:
-        if scheme["scheme_id"] == exclude_scheme:
-            continue
-
-        rules = scheme["eligibility_rules"]["rules"]
-        passed = 0
-        total = len(rules)
-
-        for rule in rules:
-            result = _evaluate_rule(rule, user_profile)
-            if result["status"] == "pass":
-                passed += 1
-
-        if total > 0:
-            match_ratio = passed / total
-            if match_ratio > 0.3:  # At least 30% rules match
-                candidates.append({
-                    "scheme_id": scheme["scheme_id"],
-                    "name": scheme["name"],
-                    "category": scheme["category"],
-                    "match_ratio": round(match_ratio, 2),
-                    "benefits": scheme["benefits"],
-                })
-
-    candidates.sort(key=lambda x: x["match_ratio"], reverse=True)
-    return candidates[:max_results]
+    catalog = catalog or get_catalog()
+    index = alternatives_index(catalog)
+    key = (exclude_scheme, max_results, _projection(user_profile, index.fields))
+    alternatives = _alternatives_cache.get(key, version=catalog.version)
+    if alternatives is None:
+        alternatives = [
+            {
+                "scheme_id": scheme["scheme_id"],
+                "name": scheme["name"],
+                "category": scheme["category"],
+                "match_ratio": match_ratio,
+                "benefits": scheme["benefits"],
+            }
+            for scheme, match_ratio in index.top(user_profile, exclude_scheme, max_results)
+        ]
+        _alternatives_cache.set(key, alternatives, version=catalog.version)
+    return list(alternatives)
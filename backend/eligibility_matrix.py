@@ -0,0 +1,282 @@
+"""
+SevaSetu — Columnar Eligibility Evaluation
+Evaluates profiles against every scheme in the catalog at once.
+
+Rules are laid out column-wise once per catalog: numeric thresholds as
+arrays per (field, operator), categorical rules as per-value pass masks.
+A profile is then a handful of NumPy comparisons and mask lookups, and the
+per-scheme pass/fail/unknown counts come from a cumulative sum over each
+scheme's contiguous block of rules.
+
+Flat rule sets are decided from those counts; schemes with nested rule
+trees are then combined from their rules' status columns.
+
+A numeric value that cannot be parsed is treated like a missing one
+(unknown).
+"""
+
+import itertools
+import math
+
+import numpy as np
+
+import rule_tree
+from eligibility_engine import NUMERIC_OPERATORS, _is_hashable as _hashable
+from schemes_data import get_catalog
+
+NUMERIC_UFUNCS = {"gt": np.greater, "gte": np.greater_equal, "lt": np.less, "lte": np.less_equal}
+CATEGORICAL_OPERATORS = ("eq", "neq", "in", "not_in")
+
+DEFAULT_LIMIT = 20
+
+
+def _number(value) -> float:
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _value_masks(entries: list) -> tuple:
+    """
+    Pass masks for the categorical rules of one field.
+
+    Returns (value -> row, masks) where masks[row, j] says whether rule j
+    passes for that value; the last row is for values no rule mentions.
+    """
+    value_row = {}
+    for _, operator, expected in entries:
+        values = expected if operator in ("in", "not_in") and isinstance(expected, list) else [expected]
+        for value in values:
+            if _hashable(value) and value not in value_row:
+                value_row[value] = len(value_row)
+
+    masks = np.zeros((len(value_row) + 1, len(entries)), dtype=bool)
+    for j, (_, operator, expected) in enumerate(entries):
+        if operator not in CATEGORICAL_OPERATORS:
+            continue  # unknown operator never passes
+        listed = expected if operator in ("in", "not_in") and isinstance(expected, list) else [expected]
+        rows = [value_row[v] for v in listed if _hashable(v)]
+        if operator in ("neq", "not_in"):
+            masks[:, j] = True
+            masks[rows, j] = False
+        else:
+            masks[rows, j] = True
+    return value_row, masks
+
+
+def _index_tree(node: dict, numbering) -> tuple:
+    """Normalised rule tree -> (logic, children) with leaves replaced by rule indices."""
+    if not rule_tree.is_group(node):
+        return next(numbering)
+    return node["logic"], [_index_tree(child, numbering) for child in node["rules"]]
+
+
+def _tree_status(node, passed: np.ndarray, unknown: np.ndarray) -> tuple:
+    """(pass, unknown) columns of a rule tree under three-valued logic."""
+    if not isinstance(node, tuple):
+        return passed[:, node], unknown[:, node]
+    logic, children = node
+    statuses = [_tree_status(child, passed, unknown) for child in children]
+    n = passed.shape[0]
+    if logic == "AND":
+        node_pass = np.ones(n, dtype=bool)
+        node_fail = np.zeros(n, dtype=bool)
+        for p, u in statuses:
+            node_pass &= p
+            node_fail |= ~p & ~u
+    else:
+        node_pass = np.zeros(n, dtype=bool)
+        node_fail = np.ones(n, dtype=bool)
+        for p, u in statuses:
+            node_pass |= p
+            node_fail &= ~p & ~u
+    return node_pass, ~node_pass & ~node_fail
+
+
+class RuleColumns:
+    """Column-wise layout of every scheme's rules for one catalog."""
+
+    def __init__(self, schemes: list):
+        self.schemes = schemes
+        self.offsets = np.zeros(len(schemes) + 1, dtype=np.int64)
+        roots = [rule_tree.normalize(s["eligibility_rules"]) for s in schemes]
+        self.is_or = np.array([root["logic"] == "OR" for root in roots], dtype=bool)
+        # (scheme row, tree of rule indices) for schemes that are not a single AND/OR group
+        self.trees = []
+        self.scheme_ids = np.array([s["scheme_id"] for s in schemes], dtype=object)
+        states = [str(s.get("state", "ALL")).strip().lower() for s in schemes]
+        self.state_codes = {state: code for code, state in enumerate(sorted(set(states) | {"all"}))}
+        self.states = np.array([self.state_codes[state] for state in states], dtype=np.int32)
+
+        fields = []
+        numeric = {}
+        categorical = {}
+        for i, root in enumerate(roots):
+            if not rule_tree.is_flat(root):
+                self.trees.append((i, _index_tree(root, itertools.count(len(fields)))))
+            for rule in rule_tree.leaves(root):
+                r = len(fields)
+                field, operator, expected = rule["field"], rule["operator"], rule["value"]
+                fields.append(field)
+                if operator in NUMERIC_OPERATORS:
+                    idx, thresholds = numeric.setdefault((field, operator), ([], []))
+                    idx.append(r)
+                    thresholds.append(float(expected))
+                else:
+                    categorical.setdefault(field, []).append((r, operator, expected))
+            self.offsets[i + 1] = len(fields)
+
+        self.n_rules = len(fields)
+        self.rule_fields = np.array(fields, dtype=object)
+        self.numeric = {
+            key: (np.array(idx, dtype=np.int64), np.array(thresholds, dtype=np.float64))
+            for key, (idx, thresholds) in numeric.items()
+        }
+        self.categorical = {}
+        for field, entries in categorical.items():
+            value_row, masks = _value_masks(entries)
+            self.categorical[field] = (np.array([r for r, _, _ in entries], dtype=np.int64), value_row, masks)
+        self.fields = sorted(set(fields))
+
+    def __len__(self):
+        return len(self.schemes)
+
+    def rule_status(self, profiles: list) -> tuple:
+        """(passed, unknown) boolean arrays of shape (profiles, rules)."""
+        n = len(profiles)
+        passed = np.zeros((n, self.n_rules), dtype=bool)
+        unknown = np.zeros((n, self.n_rules), dtype=bool)
+
+        numbers = {}
+        for (field, operator), (idx, thresholds) in self.numeric.items():
+            if field not in numbers:
+                numbers[field] = np.array([_number(p.get(field)) for p in profiles], dtype=np.float64)[:, None]
+            values = numbers[field]
+            passed[:, idx] = NUMERIC_UFUNCS[operator](values, thresholds)
+            unknown[:, idx] = np.isnan(values)
+
+        for field, (idx, value_row, masks) in self.categorical.items():
+            default = len(value_row)
+            rows = np.empty(n, dtype=np.int64)
+            missing = np.zeros((n, 1), dtype=bool)
+            for k, profile in enumerate(profiles):
+                value = profile.get(field)
+                if value is None:
+                    missing[k] = True
+                    rows[k] = default
+                else:
+                    rows[k] = value_row.get(value, default) if _hashable(value) else default
+            passed[:, idx] = masks[rows] & ~missing
+            unknown[:, idx] = missing
+
+        return passed, unknown
+
+    def state_scope(self, states: list) -> np.ndarray:
+        """(profiles, schemes) mask of schemes offered in each state (None = everywhere)."""
+        scope = np.ones((len(states), len(self.schemes)), dtype=bool)
+        nationwide = self.states == self.state_codes["all"]
+        for k, state in enumerate(states):
+            if state:
+                code = self.state_codes.get(str(state).strip().lower(), -1)
+                scope[k] = nationwide | (self.states == code)
+        return scope
+
+    def _per_scheme(self, flags: np.ndarray) -> np.ndarray:
+        """Sum rule flags over each scheme's block: (profiles, rules) -> (profiles, schemes)."""
+        totals = np.zeros((flags.shape[0], flags.shape[1] + 1), dtype=np.int32)
+        np.cumsum(flags, axis=1, out=totals[:, 1:])
+        return totals[:, self.offsets[1:]] - totals[:, self.offsets[:-1]]
+
+    def evaluate(self, profiles: list) -> dict:
+        """Per-scheme rule counts and eligibility, each an array of shape (profiles, schemes)."""
+        passed, unknown = self.rule_status(profiles)
+        n_passed = self._per_scheme(passed)
+        n_unknown = self._per_scheme(unknown)
+        total = np.diff(self.offsets).astype(np.int32)
+        n_failed = total - n_passed - n_unknown
+        eligible = np.where(self.is_or, n_passed > 0, (n_failed == 0) & (n_unknown == 0))
+        # Not eligible only because of missing information
+        blocked = ~eligible & (n_unknown > 0) & np.where(self.is_or, n_passed == 0, n_failed == 0)
+        for i, tree in self.trees:
+            eligible[:, i], blocked[:, i] = _tree_status(tree, passed, unknown)
+        return {
+            "passed": n_passed,
+            "failed": n_failed,
+            "unknown": n_unknown,
+            "total": total,
+            "eligible": eligible,
+            "blocked_by_unknown": blocked,
+            "unknown_rules": unknown,
+        }
+
+
+def rule_columns(catalog=None) -> RuleColumns:
+    """Columnar rules for a catalog (default: live), built once per catalog."""
+    catalog = catalog or get_catalog()
+    return catalog.derived("rule_columns", lambda c: RuleColumns(c.schemes))
+
+
+def _entry(scheme: dict, passed: int, failed: int, unknown: int, total: int) -> dict:
+    return {
+        "scheme_id": scheme["scheme_id"],
+        "name": scheme["name"],
+        "category": scheme["category"],
+        "benefits": scheme["benefits"],
+        "match_ratio": round(passed / total, 2) if total else 0.0,
+        "passed_count": int(passed),
+        "failed_count": int(failed),
+        "unknown_count": int(unknown),
+    }
+
+
+def eligible_schemes(user_profile: dict, state: str = None, limit: int = DEFAULT_LIMIT) -> dict:
+    """
+    Evaluate one profile against every scheme.
+
+    Args:
+        user_profile: user attributes keyed by rule field
+        state: optional state; keeps schemes for that state and nationwide ones
+        limit: maximum schemes returned per group
+
+    Returns:
+        dict with eligible, partial (some rules met) and unknown (would pass
+        given the missing fields) schemes, each ranked best first
+    """
+    columns = rule_columns()
+    result = columns.evaluate([user_profile])
+    passed, failed, unknown = result["passed"][0], result["failed"][0], result["unknown"][0]
+    total, eligible = result["total"], result["eligible"][0]
+    blocked_by_unknown = result["blocked_by_unknown"][0]
+    in_scope = columns.state_scope([state])[0]
+
+    ratio = np.divide(passed, total, out=np.zeros(len(columns)), where=total > 0)
+    eligible_rows = np.flatnonzero(in_scope & eligible)
+    unknown_rows = np.flatnonzero(in_scope & blocked_by_unknown)
+    partial_rows = np.flatnonzero(in_scope & ~eligible & ~blocked_by_unknown & (passed > 0))
+
+    # lexsort: last key is primary; ties keep catalog order
+    eligible_rows = eligible_rows[np.lexsort((eligible_rows, -passed[eligible_rows]))]
+    partial_rows = partial_rows[np.lexsort((partial_rows, -ratio[partial_rows]))]
+    unknown_rows = unknown_rows[np.lexsort((unknown_rows, -ratio[unknown_rows], unknown[unknown_rows]))]
+
+    def entries(rows):
+        return [_entry(columns.schemes[i], passed[i], failed[i], unknown[i], total[i]) for i in rows[:limit]]
+
+    unknown_entries = entries(unknown_rows)
+    unknown_rules = result["unknown_rules"][0]
+    for entry, i in zip(unknown_entries, unknown_rows):
+        start, end = columns.offsets[i], columns.offsets[i + 1]
+        entry["missing_fields"] = sorted(set(columns.rule_fields[start:end][unknown_rules[start:end]]))
+
+    return {
+        "total_schemes": int(in_scope.sum()),
+        "eligible_count": len(eligible_rows),
+        "partial_count": len(partial_rows),
+        "unknown_count": len(unknown_rows),
+        "eligible": entries(eligible_rows),
+        "partial": entries(partial_rows),
+        "unknown": unknown_entries,
+    }
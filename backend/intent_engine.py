@@ -1,38 +1,71 @@
 """
 SevaSetu — Intent Extraction Engine
 Uses Google Gemini (or keyword fallback) to extract structured intent from user text.
+
+The Gemini SDK call is blocking, so it runs in a small thread pool off the
+event loop. At most INTENT_LLM_CONCURRENCY calls are in flight; a request
+that cannot get an answer within INTENT_LLM_TIMEOUT seconds (waiting for a
+slot included) is answered by the keyword fallback instead.
+
+LLM answers are cached under the normalised text, prompt version and model:
+an in-process LRU in front of a SQLite file shared by the workers on a host
+and kept across restarts (INTENT_CACHE_PATH, empty = memory only).
+
+Concurrent cache misses are micro-batched: messages arriving within
+INTENT_BATCH_WINDOW_MS of each other (up to INTENT_BATCH_MAX) go to the LLM
+as one prompt that answers with a JSON array, and each waiting request gets
+its own element back. Items the model fails to answer fall back to keywords
+individually. INTENT_LLM=fake swaps Gemini for a local stand-in that answers
+with the keyword extractor after INTENT_FAKE_LATENCY_MS, for load tests.
 """
 
 import os
+import copy
 import json
 import re
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from cache import LRUCache, SQLiteCache, TieredCache
+
 load_dotenv()
 
+LLM_BACKEND = os.getenv("INTENT_LLM", "gemini").lower()
+FAKE_LATENCY_SECONDS = float(os.getenv("INTENT_FAKE_LATENCY_MS", "300")) / 1000
+
 # Try to import Gemini
 _gemini_available = False
-try:
-    import google.generativeai as genai
-    api_key = os.getenv("GEMINI_API_KEY", "")
-    if api_key:
-        genai.configure(api_key=api_key)
-        _gemini_available = True
-        print("[IntentEngine] Gemini API configured successfully")
-    else:
-        print("[IntentEngine] No GEMINI_API_KEY found, using keyword fallback")
-except ImportError:
-    print("[IntentEngine] google-generativeai not installed, using keyword fallback")
+if LLM_BACKEND == "fake":
+    print("[IntentEngine] Using the fake LLM stand-in (INTENT_LLM=fake)")
+else:
+    try:
+        import google.generativeai as genai
+        api_key = os.getenv("GEMINI_API_KEY", "")
+        if api_key:
+            genai.configure(api_key=api_key)
+            _gemini_available = True
+            print("[IntentEngine] Gemini API configured successfully")
+        else:
+            print("[IntentEngine] No GEMINI_API_KEY found, using keyword fallback")
+    except ImportError:
+        print("[IntentEngine] google-generativeai not installed, using keyword fallback")
 
+_llm_available = _gemini_available or LLM_BACKEND == "fake"
 
-INTENT_PROMPT = """You are SevaSetu, an AI assistant helping Indian citizens find and apply for government welfare schemes.
+MODEL_NAME = "fake" if LLM_BACKEND == "fake" else os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+LLM_TIMEOUT_SECONDS = float(os.getenv("INTENT_LLM_TIMEOUT", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("INTENT_LLM_CONCURRENCY", "4"))
+LLM_WARMUP = os.getenv("INTENT_LLM_WARMUP", "1").lower() not in ("0", "false", "no")
 
-Analyze the user's message and extract structured information.
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="intent-llm")
+_llm_slots = {}  # event loop -> semaphore; asyncio primitives are bound to one loop
 
-User message: "{user_text}"
 
-Return ONLY a valid JSON object with these fields:
-{{
+INTENT_FIELDS = """{{
     "intent": "find_scheme" | "check_eligibility" | "apply" | "grievance" | "general_query",
     "scheme_type": "agriculture" | "housing" | "health" | "education" | "livelihood" | "energy" | "employment" | "women_child" | null,
     "key_attributes": {{
@@ -46,134 +79,529 @@ Return ONLY a valid JSON object with these fields:
         "land_holding": number or null
     }},
     "summary": "brief summary of what the user needs"
-}}
+}}"""
+
+INTENT_PROMPT = """You are SevaSetu, an AI assistant helping Indian citizens find and apply for government welfare schemes.
+
+Analyze the user's message and extract structured information.
+
+User message: "{user_text}"
+
+Return ONLY a valid JSON object with these fields:
+""" + INTENT_FIELDS + """
 
 Extract what you can from the message. Set unknown fields to null.
 """
 
+INTENT_BATCH_PROMPT = """You are SevaSetu, an AI assistant helping Indian citizens find and apply for government welfare schemes.
+
+Analyze each of the following user messages independently and extract structured information from each.
+
+User messages (JSON array of {count}):
+{messages}
+
+Return ONLY a valid JSON array of exactly {count} objects, one per message in the same order, each with these fields:
+""" + INTENT_FIELDS + """
+
+Extract what you can from each message. Set unknown fields to null.
+"""
+
+# Changes whenever the prompt text does, so cached answers to an old prompt are not reused
+PROMPT_VERSION = hashlib.sha256((INTENT_PROMPT + INTENT_BATCH_PROMPT).encode("utf-8")).hexdigest()[:12]
+
+BATCH_WINDOW_SECONDS = float(os.getenv("INTENT_BATCH_WINDOW_MS", "10")) / 1000
+BATCH_MAX_ITEMS = int(os.getenv("INTENT_BATCH_MAX", "8"))
+
+INTENT_CACHE_PATH = os.getenv(
+    "INTENT_CACHE_PATH", os.path.join(os.path.dirname(__file__), "cache_data", "intent_cache.sqlite3")
+)
+INTENT_CACHE_TTL = float(os.getenv("INTENT_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+_intent_cache = None
+
+
+def _get_intent_cache() -> TieredCache:
+    """Opened on first use so offline deployments never create the cache file."""
+    global _intent_cache
+    if _intent_cache is None:
+        _intent_cache = _open_intent_cache()
+    return _intent_cache
+
+
+def _open_intent_cache() -> TieredCache:
+    memory = LRUCache(
+        maxsize=int(os.getenv("INTENT_CACHE_SIZE", "1024")), ttl=INTENT_CACHE_TTL, name="intent_memory",
+    )
+    disk = None
+    if INTENT_CACHE_PATH:
+        try:
+            disk = SQLiteCache(
+                INTENT_CACHE_PATH, maxsize=int(os.getenv("INTENT_CACHE_DISK_SIZE", "100000")),
+                ttl=INTENT_CACHE_TTL, name="intent_disk",
+            )
+        except Exception as e:
+            print(f"[IntentEngine] Persistent intent cache unavailable, using memory only: {e}")
+    return TieredCache(memory, disk)
+
+
+def _cache_key(user_text: str) -> str:
+    normalized = " ".join(user_text.lower().split())
+    return hashlib.sha256(f"{PROMPT_VERSION}|{MODEL_NAME}|{normalized}".encode("utf-8")).hexdigest()
+
+
+async def _cache_get(key: str):
+    """Memory tier inline; the SQLite tier in a thread so a locked database never stalls the event loop."""
+    cache = _get_intent_cache()
+    value = cache.memory.get(key)
+    if value is None and cache.disk is not None:
+        value = await asyncio.to_thread(cache.load, key)
+    return value
+
+
+async def _cache_set(key: str, value: dict):
+    cache = _get_intent_cache()
+    cache.memory.set(key, value)
+    if cache.disk is not None:
+        await asyncio.to_thread(cache.disk.set, key, value)
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of both intent cache tiers."""
+    return _get_intent_cache().stats()
+
+
+# Keyword tables for the fallback: (value, keywords) in priority order; the first
+# value with any keyword present as a substring of the lowercased text wins.
+INTENT_KEYWORDS = [
+    ("grievance", ["grievance", "complaint", "rejected", "appeal"]),
+    ("apply", ["apply", "application", "form", "fill"]),
+    ("check_eligibility", ["eligible", "eligibility", "qualify", "can i get"]),
+]
+SCHEME_TYPE_KEYWORDS = [
+    ("agriculture", ["farmer", "kisan", "farming", "agriculture", "crop", "land", "kheti"]),
+    ("housing", ["house", "home", "awas", "housing", "ghar", "construction"]),
+    ("health", ["health", "hospital", "medical", "insurance", "ayushman", "treatment"]),
+    ("education", ["education", "scholarship", "school", "college", "student", "study"]),
+    ("livelihood", ["business", "loan", "vendor", "shop", "mudra", "self-employed"]),
+    ("energy", ["gas", "lpg", "ujjwala", "cooking", "fuel", "cylinder"]),
+    ("employment", ["job", "employment", "work", "mgnrega", "wage", "labour", "nrega"]),
+    ("women_child", ["girl", "daughter", "sukanya", "women", "mahila", "beti"]),
+]
+OCCUPATION_KEYWORDS = [
+    ("farmer", ["farmer", "kisan", "farming"]),
+    ("street_vendor", ["vendor", "hawker", "street seller"]),
+    ("self_employed", ["self-employed", "business", "shop"]),
+    ("student", ["student", "studying"]),
+    ("labourer", ["labourer", "labour", "worker", "mazdoor"]),
+]
+GENDER_KEYWORDS = [
+    ("female", ["woman", "female", "mahila", "wife", "mother", "sister"]),
+    ("male", ["man", "male", "husband", "father", "brother"]),
+]
+CATEGORY_KEYWORDS = [("SC", ["sc"]), ("ST", ["st"]), ("OBC", ["obc"])]
+RESIDENCE_KEYWORDS = [
+    ("rural", ["village", "rural", "gaon", "gramin"]),
+    ("urban", ["city", "urban", "town", "shahar"]),
+]
+STATES = [
+    "andhra pradesh", "bihar", "chhattisgarh", "goa", "gujarat", "haryana",
+    "jharkhand", "karnataka", "kerala", "madhya pradesh", "maharashtra",
+    "odisha", "punjab", "rajasthan", "tamil nadu", "telangana",
+    "uttar pradesh", "uttarakhand", "west bengal", "assam", "manipur",
+    "meghalaya", "mizoram", "nagaland", "sikkim", "tripura", "arunachal pradesh",
+]
+
+AGE_RE = re.compile(r'(\d{1,2})\s*(?:years?|yrs?|sal)\s*old|age\s*(?:is)?\s*(\d{1,2})')
+INCOME_RE = re.compile(r'(?:income|kamai|salary)\s*(?:is)?\s*(?:rs\.?|₹)?\s*([\d,]+)')
+LAND_RE = re.compile(r'([\d.]+)\s*(?:hectare|acre|bigha)')
+
+
+def _trie_pattern(words: list) -> str:
+    """
+    Regex alternation for words built as a character trie, so the engine
+    follows one branch per character instead of trying every word, and a
+    longer word wins over its prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        terminal = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if terminal:
+            body = (body if len(branches) == 1 and len(body) == 1 else f"(?:{body})") + "?"
+        return body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """
+    Finds which of many keywords occur as substrings of a text in one scan.
+
+    The keyword trie regex returns leftmost-longest, non-overlapping matches,
+    each with the character that follows it. Keywords inside a match are
+    implied by it. The only occurrences a scan can skip are keywords that
+    start inside a match and run past its end; those are precomputed per
+    (keyword, next character) and confirmed with a substring test, so the
+    result is exactly the set of keywords `kw in text` would find.
+    """
+
+    def __init__(self, tables: dict):
+        self.tables = tables
+        keywords = sorted({kw for table in tables.values() for _, kws in table for kw in kws})
+        self.pattern = re.compile(f"({_trie_pattern(keywords)})(?=(.?))", re.DOTALL)
+        # keyword -> next character -> longer keywords that may straddle the match end
+        self.straddling = {kw: {} for kw in keywords}
+        for kw in keywords:
+            for i in range(1, len(kw)):
+                suffix = kw[i:]
+                for other in keywords:
+                    if len(other) > len(suffix) and other.startswith(suffix):
+                        self.straddling[kw].setdefault(other[len(suffix)], set()).add(other)
+        # Texts mostly hit the same few keyword combinations
+        self._resolved = LRUCache(maxsize=1024, name="keyword_matches")
+        # keyword -> every (table, priority, value) it and the keywords inside it imply
+        self.hits = {}
+        for kw in keywords:
+            contained = {k for k in keywords if k in kw}
+            self.hits[kw] = [
+                (name, priority, value)
+                for name, table in tables.items()
+                for priority, (value, kws) in enumerate(table)
+                if not contained.isdisjoint(kws)
+            ]
+
+    def keywords_in(self, text_lower: str) -> frozenset:
+        """Keywords found directly by the scan or straddling one of its matches."""
+        found = set()
+        for keyword, following in self.pattern.findall(text_lower):
+            found.add(keyword)
+            candidates = self.straddling[keyword].get(following)
+            if candidates:
+                found.update(other for other in candidates if other in text_lower)
+        return frozenset(found)
+
+    def match(self, text_lower: str) -> dict:
+        """table name -> first value (in priority order) with a keyword in the text, else None."""
+        keywords = self.keywords_in(text_lower)
+        resolved = self._resolved.get(keywords)
+        if resolved is None:
+            resolved = self._resolve(keywords)
+            self._resolved.set(keywords, resolved)
+        return dict(resolved)
+
+    def _resolve(self, keywords: frozenset) -> tuple:
+        best = {}
+        for keyword in keywords:
+            for name, priority, value in self.hits[keyword]:
+                if name not in best or priority < best[name][0]:
+                    best[name] = (priority, value)
+        return tuple((name, best[name][1] if name in best else None) for name in self.tables)
+
+
+_matcher = KeywordMatcher({
+    "intent": INTENT_KEYWORDS,
+    "scheme_type": SCHEME_TYPE_KEYWORDS,
+    "occupation": OCCUPATION_KEYWORDS,
+    "gender": GENDER_KEYWORDS,
+    "category": CATEGORY_KEYWORDS,
+    "residence": RESIDENCE_KEYWORDS,
+    "state": [(state.title(), [state]) for state in STATES],
+})
+
 
 def _keyword_fallback(text: str) -> dict:
     """Simple keyword-based intent extraction when LLM is unavailable."""
     text_lower = text.lower()
+    found = _matcher.match(text_lower)
+    scheme_type = found["scheme_type"]
 
-    # Detect intent
-    intent = "find_scheme"
-    if any(w in text_lower for w in ["grievance", "complaint", "rejected", "appeal"]):
-        intent = "grievance"
-    elif any(w in text_lower for w in ["apply", "application", "form", "fill"]):
-        intent = "apply"
-    elif any(w in text_lower for w in ["eligible", "eligibility", "qualify", "can i get"]):
-        intent = "check_eligibility"
-
-    # Detect scheme type
-    scheme_type = None
-    type_keywords = {
-        "agriculture": ["farmer", "kisan", "farming", "agriculture", "crop", "land", "kheti"],
-        "housing": ["house", "home", "awas", "housing", "ghar", "construction"],
-        "health": ["health", "hospital", "medical", "insurance", "ayushman", "treatment"],
-        "education": ["education", "scholarship", "school", "college", "student", "study"],
-        "livelihood": ["business", "loan", "vendor", "shop", "mudra", "self-employed"],
-        "energy": ["gas", "lpg", "ujjwala", "cooking", "fuel", "cylinder"],
-        "employment": ["job", "employment", "work", "mgnrega", "wage", "labour", "nrega"],
-        "women_child": ["girl", "daughter", "sukanya", "women", "mahila", "beti"],
-    }
-    for stype, keywords in type_keywords.items():
-        if any(kw in text_lower for kw in keywords):
-            scheme_type = stype
-            break
-
-    # Extract attributes
     attrs = {
-        "occupation": None, "age": None, "gender": None,
-        "income": None, "category": None, "state": None,
-        "residence": None, "land_holding": None
-    }
-
-    # Occupation
-    occ_map = {
-        "farmer": ["farmer", "kisan", "farming"],
-        "street_vendor": ["vendor", "hawker", "street seller"],
-        "self_employed": ["self-employed", "business", "shop"],
-        "student": ["student", "studying"],
-        "labourer": ["labourer", "labour", "worker", "mazdoor"],
+        "occupation": found["occupation"], "age": None, "gender": found["gender"],
+        "income": None, "category": found["category"], "state": found["state"],
+        "residence": found["residence"], "land_holding": None
     }
-    for occ, keywords in occ_map.items():
-        if any(kw in text_lower for kw in keywords):
-            attrs["occupation"] = occ
-            break
 
     # Age
-    age_match = re.search(r'(\d{1,2})\s*(?:years?|yrs?|sal)\s*old|age\s*(?:is)?\s*(\d{1,2})', text_lower)
+    age_match = AGE_RE.search(text_lower)
     if age_match:
         attrs["age"] = int(age_match.group(1) or age_match.group(2))
 
-    # Gender
-    if any(w in text_lower for w in ["woman", "female", "mahila", "wife", "mother", "sister"]):
-        attrs["gender"] = "female"
-    elif any(w in text_lower for w in ["man", "male", "husband", "father", "brother"]):
-        attrs["gender"] = "male"
-
-    # Category
-    for cat in ["SC", "ST", "OBC"]:
-        if cat.lower() in text_lower or cat in text:
-            attrs["category"] = cat
-            break
-
-    # Residence
-    if any(w in text_lower for w in ["village", "rural", "gaon", "gramin"]):
-        attrs["residence"] = "rural"
-    elif any(w in text_lower for w in ["city", "urban", "town", "shahar"]):
-        attrs["residence"] = "urban"
-
     # Income
-    income_match = re.search(r'(?:income|kamai|salary)\s*(?:is)?\s*(?:rs\.?|₹)?\s*([\d,]+)', text_lower)
+    income_match = INCOME_RE.search(text_lower)
     if income_match:
         attrs["income"] = int(income_match.group(1).replace(",", ""))
 
     # Land holding
-    land_match = re.search(r'([\d.]+)\s*(?:hectare|acre|bigha)', text_lower)
+    land_match = LAND_RE.search(text_lower)
     if land_match:
         attrs["land_holding"] = float(land_match.group(1))
 
-    # State
-    states = [
-        "andhra pradesh", "bihar", "chhattisgarh", "goa", "gujarat", "haryana",
-        "jharkhand", "karnataka", "kerala", "madhya pradesh", "maharashtra",
-        "odisha", "punjab", "rajasthan", "tamil nadu", "telangana",
-        "uttar pradesh", "uttarakhand", "west bengal", "assam", "manipur",
-        "meghalaya", "mizoram", "nagaland", "sikkim", "tripura", "arunachal pradesh",
-    ]
-    for st in states:
-        if st in text_lower:
-            attrs["state"] = st.title()
-            break
-
     return {
-        "intent": intent,
+        "intent": found["intent"] or "find_scheme",
         "scheme_type": scheme_type,
         "key_attributes": attrs,
         "summary": f"User is looking for {scheme_type or 'government'} scheme assistance."
     }
 
 
-async def extract_intent(user_text: str) -> dict:
-    """Extract structured intent from user text using LLM or fallback."""
+def _fake_generate_sync(prompt: str) -> str:
+    """
+    Local stand-in for Gemini (INTENT_LLM=fake): sleeps like a network call,
+    then answers single or batch prompts from the keyword extractor.
+    """
+    time.sleep(FAKE_LATENCY_SECONDS)
+    batch = re.search(r'User messages \(JSON array of \d+\):\n(.*)\n\nReturn ONLY', prompt, re.DOTALL)
+    if batch:
+        return json.dumps([_keyword_fallback(message) for message in json.loads(batch.group(1))])
+    single = re.search(r'User message: "(.*)"\n\nReturn ONLY', prompt, re.DOTALL)
+    return json.dumps(_keyword_fallback(single.group(1)))
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def _get_model():
+    """The shared GenerativeModel; built once so its client and connection are reused."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
 
-    if _gemini_available:
+def warm_up():
+    """
+    Build the model client and open its connection with a token-count call
+    (no generation), so the first user request does not pay for the setup.
+    Blocking; run it off the event loop at startup.
+    """
+    if not _gemini_available or not LLM_WARMUP:
+        return
+    try:
+        started = time.perf_counter()
+        _get_model().count_tokens("namaste")
+        print(f"[IntentEngine] Gemini client warmed up in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        print(f"[IntentEngine] Gemini warm-up failed, first request will connect: {e}")
+
+
+def _generate_sync(prompt: str) -> str:
+    """Blocking Gemini round trip; runs in the LLM thread pool."""
+    if LLM_BACKEND == "fake":
+        return _fake_generate_sync(prompt)
+    response = _get_model().generate_content(prompt)
+    return response.text.strip()
+
+
+async def _generate(prompt: str) -> str:
+    """
+    Run a Gemini call in the LLM thread pool. The concurrency slot is held
+    until the call actually finishes, even if the caller stops waiting, so
+    abandoned slow calls still count against the limit.
+    """
+    loop = asyncio.get_running_loop()
+    slots = _llm_slots.get(loop)
+    if slots is None:
+        _llm_slots.clear()  # drop semaphores of finished loops
+        slots = _llm_slots[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    await slots.acquire()
+    try:
+        call = _llm_executor.submit(_generate_sync, prompt)
+    except BaseException:
+        slots.release()
+        raise
+    call.add_done_callback(lambda _: _release_slot(loop, slots))
+    return await asyncio.wrap_future(call)
+
+
+def _release_slot(loop, slots):
+    try:
+        loop.call_soon_threadsafe(slots.release)
+    except RuntimeError:  # loop already closed
+        pass
+
+
+def _parse_object(text: str):
+    """First JSON object in an LLM reply, else None."""
+    json_match = re.search(r'\{[\s\S]*\}', text)
+    if not json_match:
+        return None
+    result = json.loads(json_match.group())
+    return result if isinstance(result, dict) else None
+
+
+def _parse_array(text: str, count: int) -> list:
+    """
+    Per-item answers from a batch reply: a list of count entries, each the
+    item's dict or None where the model's answer is missing or malformed.
+    """
+    json_match = re.search(r'\[[\s\S]*\]', text)
+    items = []
+    if json_match:
         try:
-            model = genai.GenerativeModel("gemini-1.5-flash")
-            prompt = INTENT_PROMPT.format(user_text=user_text)
-            response = model.generate_content(prompt)
-            text = response.text.strip()
-
-            # Extract JSON from response
-            json_match = re.search(r'\{[\s\S]*\}', text)
-            if json_match:
-                result = json.loads(json_match.group())
+            items = json.loads(json_match.group())
+        except json.JSONDecodeError:
+            items = []
+    if not isinstance(items, list):
+        items = []
+    items = items[:count] + [None] * (count - len(items))
+    return [item if isinstance(item, dict) and "intent" in item else None for item in items]
+
+
+async def _llm_extract(user_texts: list) -> list:
+    """One LLM round trip for one or more messages; None marks items it could not answer."""
+    if len(user_texts) == 1:
+        return [_parse_object(await _generate(INTENT_PROMPT.format(user_text=user_texts[0])))]
+    prompt = INTENT_BATCH_PROMPT.format(count=len(user_texts), messages=json.dumps(user_texts, ensure_ascii=False))
+    return _parse_array(await _generate(prompt), len(user_texts))
+
+
+async def _llm_extract_one(user_text: str):
+    return (await _llm_extract([user_text]))[0]
+
+
+class IntentBatcher:
+    """
+    Collects cache-missing messages for up to `window` seconds (or until
+    max_items are waiting) and sends them to the LLM as one prompt.
+    Identical messages in a window share one item. Each submit() returns a
+    future resolved with that message's answer, or None if the model failed
+    on it; callers fall back per item.
+    """
+
+    def __init__(self, window: float = BATCH_WINDOW_SECONDS, max_items: int = BATCH_MAX_ITEMS):
+        self.window = window
+        self.max_items = max(1, max_items)
+        self.loop = asyncio.get_running_loop()
+        self._pending = {}  # cache key -> (text, [futures])
+        self._timer = None
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, key: str, user_text: str) -> asyncio.Future:
+        future = self.loop.create_future()
+        if key in self._pending:
+            self._pending[key][1].append(future)
+            return future
+        self._pending[key] = (user_text, [future])
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self.loop.call_later(self.window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            self.loop.create_task(self._run(list(pending.values())))
+
+    async def _run(self, batch: list):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await _llm_extract([text for text, _ in batch])
+            print(f"[IntentEngine] Gemini answered {sum(r is not None for r in results)}/{len(batch)} batched messages")
+        except Exception as e:
+            print(f"[IntentEngine] Gemini batch of {len(batch)} failed, falling back to keywords: {e}")
+            results = [None] * len(batch)
+        for (_, futures), result in zip(batch, results):
+            for future in futures:
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+_batcher = None
+
+
+def _get_batcher() -> IntentBatcher:
+    """The batcher of the running event loop (futures and timers are bound to one loop)."""
+    global _batcher
+    if _batcher is None or _batcher.loop is not asyncio.get_running_loop():
+        _batcher = IntentBatcher()
+    return _batcher
+
+
+def batch_stats() -> dict:
+    """How many LLM prompts the batcher sent and how many messages they carried."""
+    if _batcher is None:
+        return {"batches": 0, "items": 0, "avg_batch_size": 0.0}
+    return _batcher.stats()
+
+
+def llm_available() -> bool:
+    """Whether extract_intent can call an LLM (Gemini or the fake stand-in)."""
+    return _llm_available
+
+
+async def fast_intent(user_text: str) -> tuple:
+    """
+    Best answer available without calling the LLM: the cached LLM answer if
+    there is one, else the keyword extraction.
+
+    Returns:
+        (result, source) with source "cache" or "keywords"
+    """
+    if _llm_available:
+        cached = await _cache_get(_cache_key(user_text))
+        if cached is not None:
+            return copy.deepcopy(cached), "cache"
+    return _keyword_fallback(user_text), "keywords"
+
+
+async def resolve_intent(user_text: str) -> tuple:
+    """
+    Extract intent and report where it came from.
+
+    Returns:
+        (result, source) with source "cache", "llm" or "keywords"
+    """
+    if _llm_available:
+        key = _cache_key(user_text)
+        cached = await _cache_get(key)
+        if cached is not None:
+            return copy.deepcopy(cached), "cache"
+        try:
+            if BATCH_WINDOW_SECONDS > 0:
+                call = _get_batcher().submit(key, user_text)
+            else:
+                call = _llm_extract_one(user_text)
+            result = await asyncio.wait_for(call, timeout=LLM_TIMEOUT_SECONDS)
+            if result is not None:
                 print(f"[IntentEngine] Gemini extracted intent: {result.get('intent')}")
-                return result
+                await _cache_set(key, result)
+                return copy.deepcopy(result), "llm"
+        except asyncio.TimeoutError:
+            print(f"[IntentEngine] Gemini took longer than {LLM_TIMEOUT_SECONDS:g}s, falling back to keywords")
         except Exception as e:
             print(f"[IntentEngine] Gemini error, falling back to keywords: {e}")
 
     # Fallback
-    return _keyword_fallback(user_text)
+    return _keyword_fallback(user_text), "keywords"
+
+
+async def extract_intent(user_text: str) -> dict:
+    """Extract structured intent from user text using LLM or fallback."""
+    result, _ = await resolve_intent(user_text)
+    return result
@@ -0,0 +1,151 @@
+"""
+SevaSetu — Speculative Intent + Scheme Matching
+Answers "what schemes fit this message?" without waiting for the LLM.
+
+start() sends the message to the LLM and, while that call is in flight,
+answers with the keyword extraction and a scheme search on the raw text.
+When the LLM is still pending, the response carries a refine token. The
+client redeems it with refine(), a long poll, for the LLM's intent and the
+schemes matched on it. If the intent cache already has the LLM answer, or
+no LLM is configured, the first answer is final.
+
+The refinement runs in the worker that issued the token. Its state is also
+written to a SQLite file shared by all workers (INTENT_REFINE_PATH), so a
+refine() call that lands on another worker polls that file instead.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+
+from cache import LRUCache, SQLiteCache
+from intent_engine import fast_intent, llm_available, resolve_intent
+from scheme_matcher import match_schemes
+
+REFINE_TTL_SECONDS = float(os.getenv("INTENT_REFINE_TTL", "300"))
+MAX_REFINE_WAIT_SECONDS = 30.0
+POLL_SECONDS = 0.25
+INTENT_REFINE_PATH = os.getenv(
+    "INTENT_REFINE_PATH", os.path.join(os.path.dirname(__file__), "cache_data", "intent_refinements.sqlite3")
+)
+
+# token -> {"task", "session_id"}; expired tokens are simply unknown
+_refinements = LRUCache(maxsize=4096, ttl=REFINE_TTL_SECONDS, name="intent_refinements")
+
+# token -> {"status": "pending"} or the final answer, readable by every worker
+_shared = None
+
+
+def _get_shared():
+    """Opened on first use; None (tokens only work on their own worker) if unavailable."""
+    global _shared
+    if _shared is None and INTENT_REFINE_PATH:
+        try:
+            _shared = SQLiteCache(INTENT_REFINE_PATH, maxsize=50_000, ttl=REFINE_TTL_SECONDS,
+                                  name="intent_refinements")
+        except Exception as e:
+            print(f"[IntentMatch] Shared refinement store unavailable, tokens are per-worker: {e}")
+            _shared = False
+    return _shared if _shared is not False else None
+
+
+async def _publish(token: str, value: dict):
+    shared = _get_shared()
+    if shared is not None:
+        await asyncio.to_thread(shared.set, token, value)
+
+
+async def _match(query: str, intent: dict, top_k: int, filters: dict) -> dict:
+    return await match_schemes(query, intent.get("key_attributes") or {}, top_k, filters)
+
+
+async def _refine(token: str, session_id: str, llm: asyncio.Task, user_text: str, fast: dict,
+                  fast_match: dict, top_k: int, filters: dict) -> dict:
+    """
+    The final answer once the LLM returns; reuses the fast match if nothing
+    changed. Also published to the shared store for the other workers.
+    """
+    try:
+        intent, source = await llm
+    except Exception as e:
+        print(f"[IntentMatch] Refinement failed, keeping the keyword answer: {e}")
+        intent, source = fast, "keywords"
+    changed = intent != fast
+    scheme_match = await _match(intent.get("summary") or user_text, intent, top_k, filters) if changed else fast_match
+    result = {
+        "status": "final",
+        "source": source,
+        "changed": changed,
+        "extracted_intent": intent,
+        "scheme_match": scheme_match,
+    }
+    await _publish(token, {**result, "session_id": session_id})
+    return result
+
+
+async def start(user_text: str, top_k: int = 5, filters: dict = None, session_id: str = None) -> dict:
+    """
+    Fast intent + scheme match for a message, refined later by the LLM.
+
+    Returns:
+        dict with status ("final" or "pending"), source ("cache", "keywords"),
+        extracted_intent, scheme_match and, while pending, refine_token
+    """
+    fast, source = await fast_intent(user_text)
+    if source == "cache" or not llm_available():
+        scheme_match = await _match(fast.get("summary") or user_text, fast, top_k, filters)
+        return {"status": "final", "source": source, "extracted_intent": fast, "scheme_match": scheme_match}
+
+    llm = asyncio.create_task(resolve_intent(user_text))
+    await asyncio.sleep(0)  # let the LLM request go out before the search occupies the loop
+
+    # Speculative search on the raw text; keyword summaries are too generic to search on
+    scheme_match = await _match(user_text, fast, top_k, filters)
+
+    token = str(uuid.uuid4())
+    await _publish(token, {"status": "pending"})  # before the task can publish its final answer
+    task = asyncio.create_task(_refine(token, session_id, llm, user_text, fast, scheme_match, top_k, filters))
+    _refinements.set(token, {"task": task, "session_id": session_id})
+    return {
+        "status": "pending",
+        "source": source,
+        "refine_token": token,
+        "extracted_intent": fast,
+        "scheme_match": scheme_match,
+    }
+
+
+async def refine(token: str, wait: float = 10.0) -> dict:
+    """
+    Long-poll for the refined answer of a start() call, waiting up to `wait`
+    seconds. Returns {"status": "pending", "refine_token"} if the LLM is
+    still working, else the final answer. Raises KeyError for unknown or
+    expired tokens.
+    """
+    wait = min(max(wait, 0.0), MAX_REFINE_WAIT_SECONDS)
+    entry = _refinements.get(token)
+    if entry is None:
+        return await _refine_elsewhere(token, wait)
+    task = entry["task"]
+    if not task.done() and wait > 0:
+        await asyncio.wait({task}, timeout=wait)
+    if not task.done():
+        return {"status": "pending", "refine_token": token}
+    return {**task.result(), "refine_token": token, "session_id": entry["session_id"]}
+
+
+async def _refine_elsewhere(token: str, wait: float) -> dict:
+    """refine() for a token issued by another worker: poll the shared store."""
+    shared = _get_shared()
+    deadline = time.monotonic() + wait
+    while True:
+        entry = await asyncio.to_thread(shared.get, token) if shared is not None else None
+        if entry is None:
+            raise KeyError(token)
+        if entry["status"] == "final":
+            return {**entry, "refine_token": token}
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return {"status": "pending", "refine_token": token}
+        await asyncio.sleep(min(POLL_SECONDS, remaining))
@@ -3,9 +3,11 @@ SevaSetu — Main FastAPI Application
 Central API server orchestrating all services.
 """
 
+import hmac
 import os
 import uuid
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+import asyncio
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel, Field
@@ -15,15 +17,24 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import service modules
-from intent_engine import extract_intent
-from scheme_matcher import match_schemes
-from eligibility_engine import check_eligibility
-from ocr_engine import upload_document, extract_data
+from intent_engine import (
+    extract_intent, warm_up as warm_up_intent_llm,
+    cache_stats as intent_cache_stats, batch_stats as intent_batch_stats,
+)
+from scheme_matcher import match_schemes, match_schemes_batch, cache_stats as scheme_cache_stats
+from eligibility_engine import check_eligibility, cache_stats as eligibility_cache_stats
+from eligibility_matrix import eligible_schemes
+from ocr_engine import upload_document, extract_data, OCRQueueFull
+import ocr_engine
+from document_storage import MAX_UPLOAD_BYTES, UploadTooLarge
 from document_validator import validate_documents
 from form_generator import generate_form
 from grievance_generator import generate_grievance
 from agent_workflow import get_or_create_session, process_step
-import vector_store
+import bulk_screening
+import catalog_loader
+import intent_match
+import document_store
 
 # Initialize FastAPI
 app = FastAPI(
@@ -32,7 +43,76 @@ app = FastAPI(
     version="1.0.0-mvp",
 )
 
-# CORS — allow frontend
+# Multipart framing around the file itself
+UPLOAD_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware capping the request body of upload endpoints. A declared
+    Content-Length over the cap is refused before anything is read; other
+    bodies (e.g. chunked) are counted as they arrive and cut off at the cap,
+    before Starlette spools them to a temp file.
+    """
+
+    def __init__(self, app, limits: dict):
+        """limits: path -> largest file accepted, in bytes (multipart framing is allowed on top)."""
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+        max_bytes = limit + UPLOAD_OVERHEAD_BYTES
+
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > max_bytes:
+            return await self._reject(scope, send, limit)
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def counting_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    exceeded = True
+                    raise UploadTooLarge(f"Request body exceeds {max_bytes} bytes")
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            if exceeded:
+                return  # the app's error response is replaced by the 413 below
+            started = True
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, guarded_send)
+        except UploadTooLarge:
+            pass
+        if exceeded and not started:
+            await self._reject(scope, send, limit)
+
+    async def _reject(self, scope, send, limit: int):
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": f"File exceeds the {limit // (1024 * 1024)} MB upload limit"},
+        )
+        await response(scope, None, send)
+
+
+app.add_middleware(
+    UploadSizeLimit,
+    limits={"/upload-documents": MAX_UPLOAD_BYTES, "/eligibility/bulk": bulk_screening.BULK_MAX_BYTES},
+)
+
+
+# CORS — allow frontend (added last so it also wraps the responses above)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -48,14 +128,33 @@ class IntentRequest(BaseModel):
     text: str = Field(..., description="User input text (voice transcribed or typed)")
     session_id: Optional[str] = None
 
+class IntentMatchRequest(BaseModel):
+    text: str = Field(..., description="User input text (voice transcribed or typed)")
+    session_id: Optional[str] = None
+    top_k: Optional[int] = 5
+    filters: Optional[Dict[str, Any]] = None
+
 class SchemeMatchRequest(BaseModel):
     query: str
     attributes: Optional[Dict[str, Any]] = None
     top_k: Optional[int] = 5
+    filters: Optional[Dict[str, Any]] = Field(None, description="Pre-filters, e.g. {\"state\": \"Bihar\", \"category\": \"Agriculture\"}")
+
+class SchemeBatchMatchRequest(BaseModel):
+    queries: List[str] = Field(..., max_length=100, description="Query texts to match in one pass")
+    attributes: Optional[Dict[str, Any]] = None
+    top_k: Optional[int] = 5
+    filters: Optional[Dict[str, Any]] = None
 
 class EligibilityRequest(BaseModel):
     scheme_id: str
     user_profile: Dict[str, Any]
+    explain: Optional[bool] = True
+
+class EligibilityAllRequest(BaseModel):
+    user_profile: Dict[str, Any]
+    state: Optional[str] = None
+    limit: Optional[int] = Field(default=20, ge=1, le=500)
 
 class DocumentValidationRequest(BaseModel):
     user_id: Optional[str] = "demo-user"
@@ -94,15 +193,26 @@ async def root():
         "infrastructure": "AWS (Bedrock + S3 + DynamoDB)",
         "endpoints": [
             "POST /intent",
+            "POST /intent-match",
+            "GET /intent-match/{refine_token}",
             "POST /scheme-match",
+            "POST /scheme-match/batch",
+            "GET /cache/stats",
             "POST /validate-eligibility",
+            "POST /eligibility/all",
+            "POST /eligibility/bulk",
+            "GET /eligibility/bulk/{job_id}",
+            "GET /eligibility/bulk/{job_id}/result",
             "POST /upload-documents",
             "POST /extract-ocr/{document_id}",
+            "GET /extract-ocr/{document_id}",
             "POST /validate-documents",
             "POST /generate-form",
             "POST /generate-grievance",
             "POST /workflow/step",
             "GET /workflow/status/{session_id}",
+            "POST /admin/catalog/reload",
+            "GET /admin/catalog",
             "GET /health",
         ]
     }
@@ -118,6 +228,19 @@ async def health_check():
     }
 
 
+@app.get("/cache/stats")
+async def api_cache_stats():
+    """Hit/miss counters of the in-process caches, for sizing them."""
+    return {
+        "scheme_match": scheme_cache_stats(),
+        "eligibility": eligibility_cache_stats(),
+        "intent": intent_cache_stats(),
+        "intent_batching": intent_batch_stats(),
+        "documents": document_store.stats(),
+        "ocr": ocr_engine.cache_stats(),
+    }
+
+
 # ─── Intent Extraction ───
 
 @app.post("/intent")
@@ -138,14 +261,62 @@ async def api_intent(req: IntentRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/intent-match")
+async def api_intent_match(req: IntentMatchRequest):
+    """
+    Intent + matching schemes in one call, without waiting for the LLM.
+    A "pending" answer comes from keywords and a search on the raw text;
+    GET /intent-match/{refine_token} returns the LLM-refined answer.
+    """
+    try:
+        session_id = req.session_id or str(uuid.uuid4())
+        result = await intent_match.start(req.text, req.top_k, req.filters, session_id)
+        session = get_or_create_session(session_id)
+        session.update_data("user_input", req.text)
+        session.update_data("intent", result["extracted_intent"])
+        return {"session_id": session_id, "input": req.text, **result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/intent-match/{refine_token}")
+async def api_intent_match_refine(refine_token: str, wait: float = 10.0):
+    """Long-poll (up to `wait` seconds) for the LLM-refined intent and scheme matches."""
+    try:
+        result = await intent_match.refine(refine_token, wait)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Unknown or expired refine token")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result["status"] == "final" and result.get("session_id"):
+        get_or_create_session(result["session_id"]).update_data("intent", result["extracted_intent"])
+    return result
+
+
 # ─── Scheme Matching ───
 
 @app.post("/scheme-match")
 async def api_scheme_match(req: SchemeMatchRequest):
     """Find matching government schemes using semantic search."""
     try:
-        result = await match_schemes(req.query, req.attributes, req.top_k)
+        result = await match_schemes(req.query, req.attributes, req.top_k, req.filters)
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/scheme-match/batch")
+async def api_scheme_match_batch(req: SchemeBatchMatchRequest):
+    """Match several queries at once (e.g. a burst from a CSC kiosk)."""
+    try:
+        result = await match_schemes_batch(req.queries, req.attributes, req.top_k, req.filters)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -156,12 +327,58 @@ async def api_scheme_match(req: SchemeMatchRequest):
 async def api_validate_eligibility(req: EligibilityRequest):
     """Check user eligibility for a specific scheme using rule-based logic."""
     try:
-        result = await check_eligibility(req.scheme_id, req.user_profile)
+        result = await check_eligibility(req.scheme_id, req.user_profile, explain=req.explain)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/eligibility/all")
+async def api_eligibility_all(req: EligibilityAllRequest):
+    """Evaluate one profile against every scheme; eligible, partial and unknown-field matches."""
+    try:
+        return eligible_schemes(req.user_profile, state=req.state, limit=req.limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/eligibility/bulk")
+async def api_eligibility_bulk(
+    file: UploadFile = File(...),
+    output_format: str = Form(default="jsonl"),
+    id_field: str = Form(default="id"),
+):
+    """Start a background job screening a CSV/JSONL beneficiary list against every scheme."""
+    try:
+        return await asyncio.to_thread(bulk_screening.start_job, file.file, file.filename or "",
+                                       output_format, id_field)
+    except bulk_screening.InputTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/eligibility/bulk/{job_id}")
+async def api_eligibility_bulk_status(job_id: str):
+    """Progress and throughput of a bulk screening job."""
+    job = bulk_screening.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/eligibility/bulk/{job_id}/result")
+async def api_eligibility_bulk_result(job_id: str):
+    """Download the results of a completed bulk screening job."""
+    path = bulk_screening.job_output(job_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Job not found or not completed")
+    media_type = "text/csv" if path.endswith(".csv") else "application/x-ndjson"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
+
+
 # ─── Document Upload ───
 
 @app.post("/upload-documents")
@@ -169,11 +386,14 @@ async def api_upload_documents(
     file: UploadFile = File(...),
     document_type: str = Form(...),
     user_id: str = Form(default="demo-user"),
+    auto_extract: Optional[bool] = Form(default=None),
 ):
-    """Upload a document for OCR processing."""
+    """Upload a document for OCR processing (auto_extract queues OCR straight away)."""
     try:
-        result = await upload_document(file, document_type, user_id)
+        result = await upload_document(file, document_type, user_id, auto_extract)
         return result
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -181,17 +401,41 @@ async def api_upload_documents(
 # ─── OCR Extraction ───
 
 @app.post("/extract-ocr/{document_id}")
-async def api_extract_ocr(document_id: str):
-    """Extract structured data from an uploaded document using OCR."""
+async def api_extract_ocr(document_id: str, wait: float = 0.0):
+    """
+    Queue OCR for an uploaded document. Returns the extracted data if it is
+    already done (or finishes within an opt-in `wait` long poll, in seconds),
+    else 202 with the job handle to poll at GET /extract-ocr/{document_id}.
+    """
     try:
-        result = await extract_data(document_id)
-        if "error" in result:
-            raise HTTPException(status_code=404, detail=result["error"])
-        return result
-    except HTTPException:
-        raise
+        await extract_data(document_id)
+        doc = await ocr_engine.wait_for_extraction(document_id, min(max(wait, 0.0), 60.0))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Document '{document_id}' not found")
+    except OCRQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if doc["status"] == "extracted":
+        return ocr_engine.extraction_result(doc)
+    if doc["status"] == "failed":
+        raise HTTPException(status_code=500, detail=ocr_engine.job_status(doc)["error"] or "OCR failed")
+    return JSONResponse(status_code=202, content=ocr_engine.job_status(doc))
+
+
+@app.get("/extract-ocr/{document_id}")
+async def api_extract_ocr_status(document_id: str):
+    """OCR job status of a document, with the extracted data once it is done."""
+    try:
+        doc = await asyncio.to_thread(ocr_engine.get_document, document_id, True)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not doc:
+        raise HTTPException(status_code=404, detail=f"Document '{document_id}' not found")
+    status = ocr_engine.job_status(doc)
+    if doc["status"] == "extracted":
+        status["result"] = ocr_engine.extraction_result(doc)
+    return status
 
 
 # ─── Document Validation ───
@@ -260,17 +504,53 @@ async def api_workflow_status(session_id: str):
     return session.get_status()
 
 
+# ─── Catalog Administration ───
+
+def _check_admin(token: Optional[str]):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set, then require it."""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (set ADMIN_TOKEN)")
+    if not hmac.compare_digest((token or "").encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/admin/catalog/reload")
+async def api_reload_catalog(force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    """Reload the external scheme catalog and swap it in without downtime."""
+    _check_admin(x_admin_token)
+    try:
+        return await asyncio.to_thread(catalog_loader.reload_catalog, None, force)
+    except catalog_loader.CatalogError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/admin/catalog")
+async def api_catalog_status(x_admin_token: Optional[str] = Header(None)):
+    """Show where the live catalog came from and its index generation."""
+    _check_admin(x_admin_token)
+    return catalog_loader.catalog_status()
+
+
 # ─── Startup ───
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup."""
     print("[SevaSetu] Starting up...")
-    vector_store.build_index()
+    catalog_loader.init_catalog()
+    asyncio.get_running_loop().run_in_executor(None, warm_up_intent_llm)
     print("[SevaSetu] API ready at http://localhost:8000")
     print("[SevaSetu] Docs at http://localhost:8000/docs")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    ocr_engine.shutdown()
+
+
 # ─── Run ───
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+"""
+SevaSetu — OCR Backends
+Pluggable text extraction for uploaded documents.
+
+A backend turns one stored document into {"extracted_data", "confidence"}.
+Backends run inside the OCR worker processes (see ocr_engine), so they may
+block and burn CPU freely. Select one with OCR_BACKEND:
+  - mock (default): canned data per document type, for demos
+  - tesseract: local OCR of images via pytesseract + Pillow (optional
+    dependencies, and the tesseract binary)
+Each backend has a version; bump it whenever its output changes.
+"""
+
+import io
+import os
+from abc import ABC, abstractmethod
+
+OCR_BACKEND = os.getenv("OCR_BACKEND", "mock").lower()
+
+
+# Simulated OCR outputs per document type
+MOCK_EXTRACTIONS = {
+    "AADHAAR": {
+        "name": "Raj Kumar Sharma",
+        "father_name": "Harish Sharma",
+        "dob": "1985-06-15",
+        "gender": "Male",
+        "aadhaar_number": "XXXX-XXXX-4521",
+        "address": {
+            "line1": "H.No. 45, Ward No. 3",
+            "line2": "Village Khedla",
+            "district": "Bhopal",
+            "state": "Madhya Pradesh",
+            "pincode": "462001"
+        },
+    },
+    "BANK_PASSBOOK": {
+        "account_holder_name": "Raj Kumar Sharma",
+        "bank_name": "State Bank of India",
+        "branch": "Bhopal Main Branch",
+        "account_number": "XXXXX67890",
+        "ifsc_code": "SBIN0001234",
+        "address": {
+            "line1": "H.No. 45, Ward 3",
+            "district": "Bhopal",
+            "state": "Madhya Pradesh",
+            "pincode": "462001"
+        },
+    },
+    "INCOME_CERTIFICATE": {
+        "name": "Raj Kumar Sharma",
+        "father_name": "Shri Harish Sharma",
+        "annual_income": 180000,
+        "income_source": "Agriculture",
+        "issuing_authority": "Tehsildar, Bhopal",
+        "certificate_number": "IC/2024/MP/78543",
+        "valid_until": "2025-03-31",
+    },
+    "LAND_RECORD": {
+        "owner_name": "Raj Kumar Sharma",
+        "father_name": "Harish Sharma",
+        "survey_number": "234/A",
+        "area_hectares": 1.5,
+        "land_type": "Agricultural",
+        "village": "Khedla",
+        "tehsil": "Huzur",
+        "district": "Bhopal",
+        "state": "Madhya Pradesh",
+    },
+    "RATION_CARD": {
+        "head_of_family": "Raj Kumar Sharma",
+        "card_type": "BPL",
+        "card_number": "MP/BPL/2023/45678",
+        "family_members": 4,
+        "address": {
+            "village": "Khedla",
+            "district": "Bhopal",
+            "state": "Madhya Pradesh",
+            "pincode": "462001"
+        },
+    },
+    "CASTE_CERTIFICATE": {
+        "name": "Raj Kumar Sharma",
+        "father_name": "Harish Sharma",
+        "caste": "General",
+        "category": "General",
+        "issuing_authority": "SDM, Bhopal",
+        "certificate_number": "CC/2024/MP/12345",
+    },
+    "BPL_CERTIFICATE": {
+        "name": "Raj Kumar Sharma",
+        "family_income": 120000,
+        "bpl_number": "BPL/MP/2023/6789",
+        "category": "BPL",
+        "valid_until": "2025-12-31",
+    },
+}
+
+
+class OCRBackend(ABC):
+    """Interface: extract(doc) -> {"extracted_data": dict, "confidence": float}."""
+
+    name = "base"
+    version = "0"
+
+    @abstractmethod
+    def extract(self, doc: dict) -> dict:
+        """Extract one stored document; runs in an OCR worker process."""
+
+
+class MockOCRBackend(OCRBackend):
+    """Returns the canned extraction for the document type."""
+
+    name = "mock"
+    version = "1"
+
+    def extract(self, doc: dict) -> dict:
+        extracted = MOCK_EXTRACTIONS.get(doc["document_type"], {
+            "name": "Unknown",
+            "raw_text": "OCR extraction completed but document type not recognized."
+        })
+        return {"extracted_data": extracted, "confidence": 0.94}
+
+
+class TesseractOCRBackend(OCRBackend):
+    """Raw text of an image document via Tesseract; confidence is the mean word confidence."""
+
+    name = "tesseract"
+    version = "1"
+
+    def __init__(self):
+        import pytesseract  # optional dependency, imported only when selected
+        from PIL import Image
+        self.pytesseract = pytesseract
+        self.Image = Image
+        self.lang = os.getenv("TESSERACT_LANG", "eng+hin")
+
+    def extract(self, doc: dict) -> dict:
+        from document_storage import read_document
+
+        image = self.Image.open(io.BytesIO(read_document(doc["storage"], doc["storage_key"])))
+        data = self.pytesseract.image_to_data(image, lang=self.lang, output_type=self.pytesseract.Output.DICT)
+        # Tesseract reports -1 confidence for layout rows that hold no word
+        words = [(w, float(c)) for w, c in zip(data["text"], data["conf"]) if w.strip() and float(c) >= 0]
+        confidences = [c for _, c in words]
+        return {
+            "extracted_data": {"raw_text": " ".join(w for w, _ in words)},
+            "confidence": round(sum(confidences) / len(confidences) / 100, 2) if confidences else 0.0,
+        }
+
+
+BACKENDS = {backend.name: backend for backend in (MockOCRBackend, TesseractOCRBackend)}
+
+
+def get_backend(name: str = None) -> OCRBackend:
+    """Instantiate a backend by name (default OCR_BACKEND)."""
+    name = (name or OCR_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{name}'; choose from {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[name]()
+
+
+def backend_version(name: str = None) -> str:
+    """'<name>:<version>' of a backend, without instantiating it."""
+    backend = BACKENDS[(name or OCR_BACKEND).lower()]
+    return f"{backend.name}:{backend.version}"
@@ -1,186 +1,308 @@
 """
-SevaSetu — OCR Engine (Simulated)
-Uploads documents to Amazon S3 and returns simulated extracted data.
-Architecture is pluggable for real Tesseract/Textract integration.
+SevaSetu — OCR Engine
+Uploads documents to Amazon S3 and extracts their data in the background.
+
+Extraction is a job: extract_data() queues the document on a bounded
+process pool running the configured OCR backend (ocr_backends, simulated
+by default) and returns a job handle at once. Job state lives on the
+document record, so any API worker can report it; wait_for_extraction()
+lets a request hold on for a result. OCR_AUTO_ENQUEUE=1 starts extraction
+as soon as a document is uploaded.
 """
 
+import asyncio
+import multiprocessing
 import uuid
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from aws_config import get_s3_client, is_aws_available, S3_BUCKET_DOCUMENTS
-
-# In-memory document store
-_documents = {}
-
-# Local fallback upload directory
-UPLOAD_DIR = os.path.join(os.path.dirname(__file__), "uploads")
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-
-# Simulated OCR outputs per document type
-MOCK_EXTRACTIONS = {
-    "AADHAAR": {
-        "name": "Raj Kumar Sharma",
-        "father_name": "Harish Sharma",
-        "dob": "1985-06-15",
-        "gender": "Male",
-        "aadhaar_number": "XXXX-XXXX-4521",
-        "address": {
-            "line1": "H.No. 45, Ward No. 3",
-            "line2": "Village Khedla",
-            "district": "Bhopal",
-            "state": "Madhya Pradesh",
-            "pincode": "462001"
-        },
-    },
-    "BANK_PASSBOOK": {
-        "account_holder_name": "Raj Kumar Sharma",
-        "bank_name": "State Bank of India",
-        "branch": "Bhopal Main Branch",
-        "account_number": "XXXXX67890",
-        "ifsc_code": "SBIN0001234",
-        "address": {
-            "line1": "H.No. 45, Ward 3",
-            "district": "Bhopal",
-            "state": "Madhya Pradesh",
-            "pincode": "462001"
-        },
-    },
-    "INCOME_CERTIFICATE": {
-        "name": "Raj Kumar Sharma",
-        "father_name": "Shri Harish Sharma",
-        "annual_income": 180000,
-        "income_source": "Agriculture",
-        "issuing_authority": "Tehsildar, Bhopal",
-        "certificate_number": "IC/2024/MP/78543",
-        "valid_until": "2025-03-31",
-    },
-    "LAND_RECORD": {
-        "owner_name": "Raj Kumar Sharma",
-        "father_name": "Harish Sharma",
-        "survey_number": "234/A",
-        "area_hectares": 1.5,
-        "land_type": "Agricultural",
-        "village": "Khedla",
-        "tehsil": "Huzur",
-        "district": "Bhopal",
-        "state": "Madhya Pradesh",
-    },
-    "RATION_CARD": {
-        "head_of_family": "Raj Kumar Sharma",
-        "card_type": "BPL",
-        "card_number": "MP/BPL/2023/45678",
-        "family_members": 4,
-        "address": {
-            "village": "Khedla",
-            "district": "Bhopal",
-            "state": "Madhya Pradesh",
-            "pincode": "462001"
-        },
-    },
-    "CASTE_CERTIFICATE": {
-        "name": "Raj Kumar Sharma",
-        "father_name": "Harish Sharma",
-        "caste": "General",
-        "category": "General",
-        "issuing_authority": "SDM, Bhopal",
-        "certificate_number": "CC/2024/MP/12345",
-    },
-    "BPL_CERTIFICATE": {
-        "name": "Raj Kumar Sharma",
-        "family_income": 120000,
-        "bpl_number": "BPL/MP/2023/6789",
-        "category": "BPL",
-        "valid_until": "2025-12-31",
-    },
-}
-
-
-async def upload_document(file, document_type: str, user_id: str = None) -> dict:
-    """Save uploaded document to S3 (or local fallback) and return document ID."""
-    doc_id = str(uuid.uuid4())
-    file_ext = os.path.splitext(file.filename)[1] if file.filename else ".jpg"
-    s3_key = f"documents/{user_id or 'demo-user'}/{doc_id}{file_ext}"
-
-    content = await file.read()
-
-    # Try S3 first, fallback to local
-    storage_location = "local"
-    if is_aws_available():
-        try:
-            s3 = get_s3_client()
-            s3.put_object(
-                Bucket=S3_BUCKET_DOCUMENTS,
-                Key=s3_key,
-                Body=content,
-                ContentType=file.content_type or "application/octet-stream",
-            )
-            storage_location = "s3"
-            print(f"[OCR] Uploaded to S3: {s3_key}")
-        except Exception as e:
-            print(f"[OCR] S3 upload failed, using local: {e}")
-            storage_location = "local"
-
-    if storage_location == "local":
-        file_path = os.path.join(UPLOAD_DIR, f"{doc_id}{file_ext}")
-        with open(file_path, "wb") as f:
-            f.write(content)
-        s3_key = file_path
-
-    # Store metadata
-    _documents[doc_id] = {
+import document_store
+from document_storage import store_upload
+from cache import LRUCache, SQLiteCache, TieredCache
+from ocr_backends import OCR_BACKEND, get_backend, backend_version
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+# Jobs queued or running in this process beyond which new ones are refused
+OCR_MAX_QUEUED = int(os.getenv("OCR_MAX_QUEUED", "64"))
+OCR_AUTO_ENQUEUE = os.getenv("OCR_AUTO_ENQUEUE", "0").lower() in ("1", "true", "yes")
+# A job still queued after this long is assumed lost with its worker
+OCR_STALE_SECONDS = float(os.getenv("OCR_STALE_SECONDS", "300"))
+POLL_SECONDS = 0.25
+
+OCR_CACHE_PATH = os.getenv(
+    "OCR_CACHE_PATH", os.path.join(os.path.dirname(__file__), "cache_data", "ocr_cache.sqlite3")
+)
+
+_pool = None
+# document_id -> future resolved when this process is done with the document's job;
+# claimed before the first await in extract_data so a document is only queued once
+_running = {}
+_finishing = set()  # _finish tasks, referenced until they complete
+
+# Per-process backend, set by the pool initializer
+_backend = None
+
+
+class OCRQueueFull(RuntimeError):
+    """Too many OCR jobs are already waiting."""
+
+
+def _init_worker(backend_name: str):
+    global _backend
+    _backend = get_backend(backend_name)
+
+
+def _run_ocr(doc: dict) -> dict:
+    """Runs in an OCR worker process."""
+    return _backend.extract(doc)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        get_backend(OCR_BACKEND)  # fail here, not in every worker, if the backend cannot load
+        # forkserver: workers must not be forked from the threaded API server
+        _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, initializer=_init_worker, initargs=(OCR_BACKEND,),
+                                    mp_context=multiprocessing.get_context("forkserver"))
+        print(f"[OCR] Started {OCR_WORKERS} OCR worker(s) with the '{OCR_BACKEND}' backend")
+    return _pool
+
+
+_ocr_cache = None
+
+
+def _get_ocr_cache() -> TieredCache:
+    """OCR results by backend version + content hash; opened on first use."""
+    global _ocr_cache
+    if _ocr_cache is None:
+        disk = None
+        if OCR_CACHE_PATH:
+            try:
+                disk = SQLiteCache(OCR_CACHE_PATH, maxsize=int(os.getenv("OCR_CACHE_DISK_SIZE", "100000")),
+                                   name="ocr_disk")
+            except Exception as e:
+                print(f"[OCR] Persistent OCR cache unavailable, using memory only: {e}")
+        _ocr_cache = TieredCache(LRUCache(maxsize=int(os.getenv("OCR_CACHE_SIZE", "512")), name="ocr_memory"), disk)
+    return _ocr_cache
+
+
+def _ocr_cache_key(doc: dict):
+    """None for records uploaded before content hashing."""
+    if not doc.get("content_hash"):
+        return None
+    return f"{backend_version(OCR_BACKEND)}|{doc['document_type']}|{doc['content_hash']}"
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of both OCR result cache tiers."""
+    return _get_ocr_cache().stats()
+
+
+def shutdown():
+    """Stop the OCR workers (queued jobs are cancelled)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _find_duplicate(user_id: str, document_type: str, content_hash: str):
+    """The user's existing record of the same document (same type and content), if any."""
+    for doc in document_store.documents_for_user(user_id):
+        if doc.get("content_hash") == content_hash and doc["document_type"] == document_type:
+            return doc
+    return None
+
+
+async def upload_document(file, document_type: str, user_id: str = None, auto_extract: bool = None) -> dict:
+    """
+    Stream uploaded document to S3 (or local fallback) and return document ID.
+    Identical content is stored once; a user re-uploading the same document
+    gets their existing record back. With auto_extract (default
+    OCR_AUTO_ENQUEUE) an OCR job is queued too.
+    """
+    user_id = user_id or "demo-user"
+    document_type = document_type.upper()
+
+    # Streamed in chunks and hashed on the way; raises UploadTooLarge past the cap
+    stored = await store_upload(file)
+
+    doc = await asyncio.to_thread(_find_duplicate, user_id, document_type, stored["content_hash"])
+    if doc:
+        message = f"Document '{file.filename}' was already uploaded; reusing it."
+    else:
+        doc = {
+            "document_id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "document_type": document_type,
+            "storage": stored["storage"],
+            "storage_key": stored["storage_key"],
+            "content_hash": stored["content_hash"],
+            "size_bytes": stored["size_bytes"],
+            "file_name": file.filename,
+            "uploaded_at": datetime.now().isoformat(),
+            "status": "uploaded",
+            "extracted_data": None,
+        }
+        # Store metadata
+        await asyncio.to_thread(document_store.put_document, doc)
+        message = f"Document '{file.filename}' uploaded successfully. Ready for OCR extraction."
+
+    doc_id = doc["document_id"]
+    result = {
         "document_id": doc_id,
-        "user_id": user_id or "demo-user",
-        "document_type": document_type.upper(),
-        "storage": storage_location,
-        "storage_key": s3_key,
-        "file_name": file.filename,
-        "uploaded_at": datetime.now().isoformat(),
-        "status": "uploaded",
-        "extracted_data": None,
+        "status": doc["status"],
+        "storage": stored["storage"],
+        "size_bytes": stored["size_bytes"],
+        "content_hash": stored["content_hash"],
+        "deduplicated": stored["deduplicated"],
+        "message": message,
     }
+    if OCR_AUTO_ENQUEUE if auto_extract is None else auto_extract:
+        try:
+            result["ocr_job"] = await extract_data(doc_id)
+        except OCRQueueFull as e:
+            print(f"[OCR] Not auto-extracting {doc_id}: {e}")
+    return result
+
 
+def job_status(doc: dict) -> dict:
+    """Public view of a document's OCR job."""
+    job = doc.get("ocr_job") or {}
     return {
-        "document_id": doc_id,
-        "status": "uploaded",
-        "storage": storage_location,
-        "message": f"Document '{file.filename}' uploaded successfully. Ready for OCR extraction.",
+        "job_id": job.get("job_id"),
+        "document_id": doc["document_id"],
+        "document_type": doc["document_type"],
+        "status": doc["status"],
+        "backend": job.get("backend"),
+        "queued_at": job.get("queued_at"),
+        "finished_at": job.get("finished_at"),
+        "cached": job.get("cached", False),
+        "error": job.get("error"),
+    }
+
+
+def extraction_result(doc: dict) -> dict:
+    """The extraction response for a document whose job has finished successfully."""
+    return {
+        "document_id": doc["document_id"],
+        "document_type": doc["document_type"],
+        "extracted_data": doc["extracted_data"],
+        "confidence": doc.get("confidence"),
+        "status": "extracted",
+        "message": f"Successfully extracted data from {doc['document_type']} document.",
     }
 
 
+def _queued_elsewhere(doc: dict) -> bool:
+    """Queued recently by another API worker; older queued jobs are presumed lost and re-run."""
+    if doc["status"] != "queued":
+        return False
+    queued_at = datetime.fromisoformat(doc["ocr_job"]["queued_at"])
+    return (datetime.now() - queued_at).total_seconds() < OCR_STALE_SECONDS
+
+
 async def extract_data(document_id: str) -> dict:
-    """Extract data from uploaded document using simulated OCR."""
-    doc = _documents.get(document_id)
+    """
+    Queue OCR for an uploaded document and return its job handle. A document
+    already queued or extracted is not queued again, and content OCRed
+    before by the same backend version is answered from the OCR cache.
+
+    Raises:
+        KeyError: unknown document
+        OCRQueueFull: OCR_MAX_QUEUED jobs are already waiting in this process
+    """
+    doc = await asyncio.to_thread(document_store.get_document, document_id, True)
     if not doc:
-        return {"error": f"Document '{document_id}' not found"}
+        raise KeyError(document_id)
+    if document_id in _running or doc["status"] == "extracted" or _queued_elsewhere(doc):
+        return job_status(doc)
+    if len(_running) >= OCR_MAX_QUEUED:
+        raise OCRQueueFull(f"{len(_running)} OCR jobs already queued; try again shortly")
+    slot = _running[document_id] = asyncio.get_running_loop().create_future()
 
-    doc_type = doc["document_type"]
+    seen_job = (doc.get("ocr_job") or {}).get("job_id")
+    try:
+        key = _ocr_cache_key(doc)
+        cached = await asyncio.to_thread(_get_ocr_cache().get, key) if key else None
+        if cached is not None:
+            now = datetime.now().isoformat()
+            job = {"job_id": str(uuid.uuid4()), "backend": OCR_BACKEND, "queued_at": now, "finished_at": now,
+                   "cached": True}
+            doc = await asyncio.to_thread(document_store.update_document, document_id, seen_job,
+                                          status="extracted", extracted_data=cached["extracted_data"],
+                                          confidence=cached["confidence"], ocr_job=job)
+            _release(document_id, slot)
+            return job_status(doc)
 
-    # Get simulated extraction
-    extracted = MOCK_EXTRACTIONS.get(doc_type, {
-        "name": "Unknown",
-        "raw_text": "OCR extraction completed but document type not recognized."
-    })
+        job = {"job_id": str(uuid.uuid4()), "backend": OCR_BACKEND, "queued_at": datetime.now().isoformat()}
+        doc = await asyncio.to_thread(document_store.update_document, document_id, seen_job,
+                                      status="queued", ocr_job=job)
+        future = asyncio.get_running_loop().run_in_executor(_get_pool(), _run_ocr, doc)
+    except document_store.JobChanged as e:
+        # Another API worker queued (or finished) it since we read the record
+        _release(document_id, slot)
+        return job_status(e.doc)
+    except BaseException:
+        _release(document_id, slot)
+        raise
+    task = asyncio.create_task(_finish(document_id, job, future, key, slot))
+    _finishing.add(task)
+    task.add_done_callback(_finishing.discard)
+    return job_status(doc)
 
-    # Update stored document
-    doc["extracted_data"] = extracted
-    doc["status"] = "extracted"
 
-    return {
-        "document_id": document_id,
-        "document_type": doc_type,
-        "extracted_data": extracted,
-        "confidence": 0.94,
-        "status": "extracted",
-        "message": f"Successfully extracted data from {doc_type} document.",
-    }
+def _release(document_id: str, slot: asyncio.Future):
+    """Free a document's _running slot and wake anyone waiting on it."""
+    if _running.get(document_id) is slot:
+        del _running[document_id]
+    if not slot.done():
+        slot.set_result(None)
+
+
+async def _finish(document_id: str, job: dict, future, cache_key: str, slot: asyncio.Future):
+    try:
+        result = await future
+        fields = {"status": "extracted", "extracted_data": result["extracted_data"],
+                  "confidence": result["confidence"]}
+        if cache_key:
+            await asyncio.to_thread(_get_ocr_cache().set, cache_key, result)
+    except Exception as e:
+        print(f"[OCR] Extraction of {document_id} failed: {e}")
+        fields = {"status": "failed"}
+        job = {**job, "error": str(e)}
+    try:
+        job = {**job, "finished_at": datetime.now().isoformat()}
+        await asyncio.to_thread(document_store.update_document, document_id, job["job_id"], ocr_job=job, **fields)
+    except document_store.JobChanged as e:
+        print(f"[OCR] Result for {document_id} dropped; the document moved on to job {e.doc['ocr_job']['job_id']}")
+    finally:
+        _release(document_id, slot)
+
+
+async def wait_for_extraction(document_id: str, timeout: float) -> dict:
+    """
+    Wait up to timeout seconds for a document's OCR job to finish; returns
+    the document record either way (None if unknown). Jobs started by another
+    API worker are followed through the document store.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max(timeout, 0.0)
+    slot = _running.get(document_id)
+    if slot is not None:
+        await asyncio.wait({slot}, timeout=max(timeout, 0.0))
+    while True:
+        doc = await asyncio.to_thread(document_store.get_document, document_id, True)
+        if doc is None or doc["status"] != "queued" or loop.time() >= deadline:
+            return doc
+        await asyncio.sleep(min(POLL_SECONDS, deadline - loop.time()))
 
 
-def get_document(document_id: str) -> dict:
+def get_document(document_id: str, fresh: bool = False) -> dict:
     """Get document by ID."""
-    return _documents.get(document_id)
+    return document_store.get_document(document_id, fresh)
 
 
 def get_all_documents_for_user(user_id: str = "demo-user") -> list:
     """Get all documents for a user."""
-    return [d for d in _documents.values() if d["user_id"] == user_id]
+    return document_store.documents_for_user(user_id)
@@ -0,0 +1,126 @@
+"""
+SevaSetu — Eligibility Rule Trees
+Helpers for nested eligibility_rules expressions.
+
+A node is either a leaf rule {"field", "operator", "value", "label"} or a
+group {"logic": "AND" | "OR" | "NOT", "rules": [...], "label"}; NOT groups
+hold exactly one node. A scheme's eligibility_rules is the root group, so
+the original flat {"logic": "AND", "rules": [...]} shape is a one-level tree.
+
+normalize() pushes every NOT down to the leaves (inverting their operators)
+and merges directly nested groups of the same logic, so consumers only ever
+see AND/OR groups over plain leaves. Negated nodes get "Not: <label>"
+unless the NOT carries its own label, which then names the result.
+"""
+
+LOGICS = ("AND", "OR", "NOT")
+OPERATORS = {"eq", "neq", "gt", "gte", "lt", "lte", "in", "not_in"}
+
+INVERSE_OPERATORS = {
+    "eq": "neq", "neq": "eq",
+    "gt": "lte", "lte": "gt",
+    "gte": "lt", "lt": "gte",
+    "in": "not_in", "not_in": "in",
+}
+
+
+def is_group(node: dict) -> bool:
+    return "rules" in node
+
+
+def _negated_label(label: str) -> str:
+    return f"Not: {label}"
+
+
+def _negate_leaf(rule: dict) -> dict:
+    operator = INVERSE_OPERATORS.get(rule["operator"], rule["operator"])
+    label = _negated_label(rule["label"]) if rule.get("label") else f"{rule['field']} {operator} {rule['value']}"
+    return {**rule, "operator": operator, "label": label}
+
+
+def normalize(eligibility_rules: dict) -> dict:
+    """Negation-normal form of a scheme's rules: a root AND/OR group over leaves and groups."""
+    root = _normalize(eligibility_rules)
+    return root if is_group(root) else {"logic": "AND", "rules": [root]}
+
+
+def _normalize(node: dict, negate: bool = False) -> dict:
+    if not is_group(node):
+        return _negate_leaf(node) if negate else node
+
+    logic = node.get("logic", "AND")
+    if logic == "NOT":
+        result = _normalize(node["rules"][0], not negate)
+        if node.get("label"):
+            # The NOT's own "must not ..." label describes the result better than the inner one
+            result = {**result, "label": _negated_label(node["label"]) if negate else node["label"]}
+        return result
+    if negate:  # De Morgan
+        logic = "OR" if logic == "AND" else "AND"
+
+    children = []
+    for child in node["rules"]:
+        child = _normalize(child, negate)
+        if is_group(child) and child["logic"] == logic and "label" not in child:
+            children.extend(child["rules"])
+        else:
+            children.append(child)
+
+    group = {"logic": logic, "rules": children}
+    if node.get("label"):
+        group["label"] = _negated_label(node["label"]) if negate else node["label"]
+    return group
+
+
+def leaves(node: dict):
+    """Leaf rules of a tree in declaration order."""
+    if not is_group(node):
+        yield node
+        return
+    for child in node.get("rules", []):
+        yield from leaves(child)
+
+
+def mandatory_leaves(node: dict):
+    """Leaves of a normalised tree that every eligible applicant must pass (reached through ANDs only)."""
+    if not is_group(node):
+        yield node
+        return
+    if node["logic"] != "AND":
+        return
+    for child in node["rules"]:
+        yield from mandatory_leaves(child)
+
+
+def is_flat(node: dict) -> bool:
+    """A normalised tree that is a single group of leaves."""
+    return is_group(node) and not any(is_group(child) for child in node["rules"])
+
+
+def validate(node, where: str, path: str = "rules") -> list:
+    """Problems with one node and its descendants (empty when valid)."""
+    if not isinstance(node, dict):
+        return [f"{where}: {path} must be an object"]
+    if is_group(node):
+        logic = node.get("logic", "AND")
+        if logic not in LOGICS:
+            return [f"{where}: {path} logic must be AND, OR or NOT"]
+        if not isinstance(node["rules"], list):
+            return [f"{where}: {path} must have a rules list"]
+        if logic == "NOT" and len(node["rules"]) != 1:
+            return [f"{where}: {path} NOT needs exactly one rule"]
+        problems = []
+        for j, child in enumerate(node["rules"]):
+            problems.extend(validate(child, where, f"{path}.rules[{j}]"))
+        return problems
+
+    if not {"field", "operator", "value"} <= node.keys():
+        return [f"{where}: rule {path} needs field, operator and value"]
+    operator, value = node["operator"], node["value"]
+    if operator not in OPERATORS:
+        return [f"{where}: rule {path} has unknown operator '{operator}'"]
+    if operator in ("in", "not_in") and not isinstance(value, list):
+        return [f"{where}: rule {path} '{operator}' needs a list value"]
+    if operator in ("gt", "gte", "lt", "lte") and (isinstance(value, bool) or not isinstance(value, (int, float))):
+        return [f"{where}: rule {path} '{operator}' needs a numeric value"]
+    return []
@@ -1,46 +1,130 @@
 """
 SevaSetu — Scheme Matcher
 Takes extracted intent and performs vector search + optional filtering.
+
+Search hits are re-ranked against the user's attributes. Per-scheme
+compatibility arrays are precomputed for every index generation, so the
+re-ranking is a handful of NumPy operations over a wider candidate set.
+
+Single-query results are cached (LRU + TTL) under the normalised query,
+attributes, filters and top_k. Entries are tagged with the index generation
+they were computed from, so any catalog change invalidates them.
 """
 
-from vector_store import search as vector_search
-from schemes_data import get_all_schemes
+import json
+import os
+import re
 
+import numpy as np
 
-async def match_schemes(query: str, attributes: dict = None, top_k: int = 5) -> dict:
-    """
-    Find matching schemes using semantic search and optional attribute filtering.
+from cache import LRUCache
+from eligibility_engine import NUMERIC_OPERATORS
+from vector_store import (
+    current_generation, register_generation_hook, rule_value_masks, mandatory_rules,
+    search_rows, search_many_rows,
+)
 
-    Args:
-        query: search query text
-        attributes: optional user attributes for filtering
-        top_k: number of results to return
+_result_cache = LRUCache(
+    maxsize=int(os.getenv("SCHEME_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("SCHEME_CACHE_TTL", "600")),
+    name="scheme_match",
+)
 
-    Returns:
-        dict with matched schemes and metadata
-    """
-    # Perform vector search
-    results = vector_search(query, top_k=top_k)
+# Candidates fetched per requested result before re-ranking
+RERANK_DEPTH = 4
+RERANK_MIN_CANDIDATES = 20
 
-    matched = []
-    for r in results:
-        scheme = r["scheme"]
-        score = r["score"]
-
-        # Compute a simple attribute-based boost
-        boost = 0.0
-        if attributes:
-            occupation = attributes.get("occupation")
-            if occupation:
-                for rule in scheme["eligibility_rules"]["rules"]:
-                    if rule["field"] == "occupation":
-                        if rule["operator"] == "eq" and rule["value"] == occupation:
-                            boost = 0.15
-                        elif rule["operator"] == "in" and occupation in rule["value"]:
-                            boost = 0.15
-
-        final_score = min(score + boost, 1.0)
+# Attribute -> rule field; boosts apply when the scheme targets the user's value
+CATEGORICAL_BOOSTS = {
+    "occupation": 0.15,
+    "gender": 0.05,
+    "residence": 0.05,
+    "category": 0.05,
+}
+# Subtracted for every attribute the user's value is explicitly incompatible with
+MISMATCH_PENALTY = 0.2
+
+
+# Attributes checked against the schemes' mandatory numeric rules on the same field
+NUMERIC_FIELDS = ("income", "age")
+
+
+def _numeric_limits(schemes: list, field: str) -> dict:
+    """Per-scheme tightest threshold of each mandatory gt/gte/lt/lte rule, by operator."""
+    limits = {
+        operator: np.full(len(schemes), np.inf if operator in ("lt", "lte") else -np.inf)
+        for operator in NUMERIC_OPERATORS
+    }
+    for i, scheme in enumerate(schemes):
+        for rule in mandatory_rules(scheme, field):
+            operator = rule["operator"]
+            if operator in ("gt", "gte"):
+                limits[operator][i] = max(limits[operator][i], float(rule["value"]))
+            elif operator in ("lt", "lte"):
+                limits[operator][i] = min(limits[operator][i], float(rule["value"]))
+    return limits
 
+
+def _violates(value: float, limits: dict, rows: np.ndarray) -> np.ndarray:
+    """Rows with a numeric rule value fails, compared exactly as the eligibility engine does."""
+    failed = np.zeros(len(rows), dtype=bool)
+    for operator, thresholds in limits.items():
+        failed |= ~NUMERIC_OPERATORS[operator](value, thresholds[rows])
+    return failed
+
+
+def _build_rank_features(gen) -> dict:
+    """Attribute compatibility arrays for one index generation."""
+    features = {"masks": {}, "restricted": {}}
+    for field in CATEGORICAL_BOOSTS:
+        features["masks"][field], features["restricted"][field] = rule_value_masks(gen.schemes, field)
+    features["limits"] = {field: _numeric_limits(gen.schemes, field) for field in NUMERIC_FIELDS}
+    return features
+
+
+register_generation_hook("rank_features", _build_rank_features)
+
+
+def _as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _adjust_scores(gen, rows: np.ndarray, scores: np.ndarray, attributes: dict) -> np.ndarray:
+    """Vectorised attribute boosts/penalties for the candidate rows."""
+    if not attributes or len(rows) == 0:
+        return scores
+    features = gen.extra("rank_features")
+    adjusted = scores.copy()
+
+    for field, boost in CATEGORICAL_BOOSTS.items():
+        value = attributes.get(field)
+        if value is None or value == "":
+            continue
+        masks = features["masks"][field]
+        compatible = masks.get(str(value).strip().lower(), masks[None])[rows]
+        restricted = features["restricted"][field][rows]
+        adjusted += np.where(compatible & restricted, boost, 0.0)
+        adjusted -= np.where(~compatible, MISMATCH_PENALTY, 0.0)
+
+    for field, limits in features["limits"].items():
+        value = _as_number(attributes.get(field))
+        if value is not None:
+            adjusted -= np.where(_violates(value, limits, rows), MISMATCH_PENALTY, 0.0)
+
+    return np.clip(adjusted, 0.0, 1.0)
+
+
+def _rank(query: str, gen, rows: np.ndarray, scores: np.ndarray, attributes: dict, top_k: int) -> dict:
+    """Re-rank raw search hits by user attributes and build the response dict."""
+    final = _adjust_scores(gen, rows, scores, attributes)
+    order = np.argsort(-final, kind="stable")[:top_k]
+
+    matched = []
+    for i in order:
+        scheme = gen.schemes[rows[i]]
         matched.append({
             "scheme_id": scheme["scheme_id"],
             "name": scheme["name"],
@@ -49,15 +133,96 @@ async def match_schemes(query: str, attributes: dict = None, top_k: int = 5) ->
             "description": scheme["description"],
             "benefits": scheme["benefits"],
             "required_documents": scheme["required_documents"],
-            "score": round(final_score, 3),
+            "score": round(float(final[i]), 3),
             "official_website": scheme["official_website"],
         })
 
-    # Sort by final score descending
-    matched.sort(key=lambda x: x["score"], reverse=True)
-
     return {
         "query": query,
         "total_results": len(matched),
-        "schemes": matched[:top_k],
+        "schemes": matched,
+    }
+
+
+def _depth(top_k: int, attributes: dict) -> int:
+    """How many candidates to retrieve so re-ranking can promote schemes from further down."""
+    if not attributes:
+        return top_k
+    return max(top_k * RERANK_DEPTH, RERANK_MIN_CANDIDATES)
+
+
+def _cache_key(query: str, attributes: dict, top_k: int, filters: dict) -> tuple:
+    """
+    Cache key for a match request. The query is reduced to its lowercase word
+    tokens, which is all the TF-IDF analyzer looks at, so spacing, case and
+    punctuation variants share an entry.
+    """
+    normalized = " ".join(re.findall(r"\w+", query.lower()))
+    active = {k: v for k, v in (attributes or {}).items() if v is not None}
+    return (
+        normalized,
+        json.dumps(active, sort_keys=True, default=str),
+        json.dumps(filters or {}, sort_keys=True, default=str),
+        top_k,
+    )
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the match result cache."""
+    return _result_cache.stats()
+
+
+def clear_cache():
+    """Drop all cached match results."""
+    _result_cache.clear()
+
+
+async def match_schemes(query: str, attributes: dict = None, top_k: int = 5, filters: dict = None) -> dict:
+    """
+    Find matching schemes using semantic search and optional attribute filtering.
+
+    Args:
+        query: search query text
+        attributes: optional user attributes used to re-rank results
+        top_k: number of results to return
+        filters: optional hard filters (state, category, occupation, residence,
+            gender) applied before scoring
+
+    Returns:
+        dict with matched schemes and metadata
+    """
+    key = _cache_key(query, attributes, top_k, filters)
+    generation = current_generation().number
+    cached = _result_cache.get(key, version=generation)
+    if cached is not None:
+        return {**cached, "query": query}
+
+    # Perform vector search
+    gen, rows, scores = search_rows(query, top_k=_depth(top_k, attributes), filters=filters)
+    result = _rank(query, gen, rows, scores, attributes, top_k)
+    _result_cache.set(key, result, version=gen.number)
+    return result
+
+
+async def match_schemes_batch(queries: list, attributes: dict = None, top_k: int = 5,
+                              filters: dict = None) -> dict:
+    """
+    Match a burst of queries in one vectorised search pass.
+
+    Args:
+        queries: list of search query texts
+        attributes: optional user attributes applied to every query
+        top_k: number of results to return per query
+        filters: optional hard filters applied to every query
+
+    Returns:
+        dict with one match_schemes-style result per query, in input order
+    """
+    gen, all_results = search_many_rows(queries, top_k=_depth(top_k, attributes), filters=filters)
+    return {
+        "total_queries": len(queries),
+        "results": [
+            _rank(query, gen, rows, scores, attributes, top_k)
+            for query, (rows, scores) in zip(queries, all_results)
+        ],
     }
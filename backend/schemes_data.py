@@ -5,6 +5,8 @@ rules, comprehensive descriptions, and required documentation to demonstrate the
 rule engine's capabilities.
 """
 
+import itertools
+
 SCHEMES = [
     {
         "scheme_id": "PM-KISAN",
@@ -298,7 +300,14 @@ SCHEMES = [
             "rules": [
                 {"field": "occupation", "operator": "in", "value": ["entrepreneur", "self_employed", "business"], "label": "Must be starting a new greenfield enterprise"},
                 {"field": "age", "operator": "gte", "value": 18, "label": "Applicant must be above 18 years of age"},
-                {"field": "category_or_gender", "operator": "in", "value": ["SC", "ST", "female"], "label": "Must be an SC/ST applicant OR a Woman entrepreneur"},
+                {
+                    "logic": "OR",
+                    "label": "Must be an SC/ST applicant OR a Woman entrepreneur",
+                    "rules": [
+                        {"field": "category", "operator": "in", "value": ["SC", "ST"], "label": "Applicant belongs to the SC/ST category"},
+                        {"field": "gender", "operator": "eq", "value": "female", "label": "Applicant is a woman entrepreneur"},
+                    ]
+                },
             ]
         },
         "official_website": "https://www.standupmitra.in/",
@@ -307,23 +316,90 @@ SCHEMES = [
 ]
 
 
+_catalog_versions = itertools.count(1)
+
+
+class SchemeCatalog:
+    """
+    Immutable, indexed view of a list of schemes.
+
+    Builds a scheme_id -> scheme dict once, so lookups by id cost the same
+    however large the catalog grows. Edits build a new catalog that replaces
+    the old one in a single assignment.
+    """
+
+    def __init__(self, schemes: list, source: str = "built-in", content_hash: str = None):
+        self.schemes = list(schemes)
+        self.source = source
+        self.content_hash = content_hash
+        # Unique per catalog instance; tags results computed from it
+        self.version = next(_catalog_versions)
+        self.by_id = {s["scheme_id"]: s for s in self.schemes}
+        self._derived = {}
+
+        if len(self.by_id) != len(self.schemes):
+            # Later entries win, as with vector_store.upsert_schemes
+            self.schemes = list(self.by_id.values())
+
+    def __len__(self):
+        return len(self.schemes)
+
+    def get(self, scheme_id: str):
+        return self.by_id.get(scheme_id)
+
+    def derived(self, name: str, builder):
+        """
+        Memoise data compiled from this catalog (e.g. eligibility rules) so it is
+        built once per catalog load and discarded together with the catalog.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            value = self._derived[name] = builder(self)
+        return value
+
+    def with_changes(self, upserts: list = (), deletes: list = ()) -> "SchemeCatalog":
+        """New catalog with schemes added/replaced and others removed; order is kept."""
+        replaced = {s["scheme_id"]: s for s in upserts}
+        dropped = set(deletes)
+        schemes = [replaced.pop(s["scheme_id"], s) for s in self.schemes if s["scheme_id"] not in dropped]
+        schemes.extend(s for sid, s in replaced.items() if sid not in dropped)
+        return SchemeCatalog(schemes, source=self.source)
+
+
+_catalog = SchemeCatalog(SCHEMES)
+
+
+def get_catalog() -> SchemeCatalog:
+    """Return the current catalog snapshot."""
+    return _catalog
+
+
 def get_all_schemes():
     """Return all schemes."""
-    return SCHEMES
+    return _catalog.schemes
 
 
 def get_scheme_by_id(scheme_id: str):
     """Return a single scheme by ID."""
-    for s in SCHEMES:
-        if s["scheme_id"] == scheme_id:
-            return s
-    return None
+    return _catalog.by_id.get(scheme_id)
+
+
+def get_scheme_text(scheme: dict) -> str:
+    """Return the text of a scheme that is used for vector indexing."""
+    return f"{scheme['name']}. {scheme['description']} Category: {scheme['category']}. Benefits: {scheme['benefits']}"
 
 
 def get_scheme_descriptions():
     """Return (scheme_id, text) pairs for vector indexing."""
-    pairs = []
-    for s in SCHEMES:
-        text = f"{s['name']}. {s['description']} Category: {s['category']}. Benefits: {s['benefits']}"
-        pairs.append((s["scheme_id"], text))
-    return pairs
+    return [(s["scheme_id"], get_scheme_text(s)) for s in _catalog.schemes]
+
+
+def set_schemes(schemes: list):
+    """Replace the whole catalog (e.g. with a synthetic one for benchmarks)."""
+    set_catalog(SchemeCatalog(schemes))
+
+
+def set_catalog(catalog: SchemeCatalog):
+    """Swap in a fully built catalog."""
+    global _catalog
+    _catalog = catalog
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# Local stand-in for Gemini and no shared cache file; set before intent_engine reads them
+os.environ["INTENT_LLM"] = "fake"
+os.environ["INTENT_FAKE_LATENCY_MS"] = "20"
+os.environ["INTENT_BATCH_WINDOW_MS"] = "20"
+os.environ["INTENT_BATCH_MAX"] = "8"
+os.environ["INTENT_CACHE_PATH"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
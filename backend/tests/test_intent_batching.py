@@ -0,0 +1,84 @@
+"""IntentBatcher against the fake LLM backend (INTENT_LLM=fake, see conftest.py)."""
+
+import asyncio
+import json
+
+import pytest
+
+import intent_engine
+
+MESSAGES = [
+    "I am a farmer in Bihar",
+    "student from Kerala needs a scholarship",
+    "widow in Rajasthan looking for pension",
+    "pregnant woman in Uttar Pradesh needs health help",
+    "unemployed youth in Delhi wants a loan to start a business",
+]
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    """Clean intent cache; records every prompt sent to the fake LLM."""
+    intent_engine._get_intent_cache().clear()
+    sent = []
+    generate = intent_engine._generate_sync
+
+    def recording(prompt):
+        sent.append(prompt)
+        return generate(prompt)
+
+    monkeypatch.setattr(intent_engine, "_generate_sync", recording)
+    return sent
+
+
+def _resolve_all(texts: list) -> list:
+    async def run():
+        return await asyncio.gather(*(intent_engine.resolve_intent(text) for text in texts))
+    return asyncio.run(run())
+
+
+def test_batched_answers_reach_their_callers(prompts):
+    expected = [intent_engine._keyword_fallback(text) for text in MESSAGES]
+    assert len({json.dumps(e, sort_keys=True) for e in expected}) == len(MESSAGES)
+
+    results = _resolve_all(MESSAGES)
+
+    assert len(prompts) == 1
+    assert [source for _, source in results] == ["llm"] * len(MESSAGES)
+    assert [result for result, _ in results] == expected
+
+
+def test_identical_messages_share_one_item(prompts):
+    results = _resolve_all([MESSAGES[0], MESSAGES[1], MESSAGES[0]])
+
+    assert len(prompts) == 1
+    assert "JSON array of 2" in prompts[0]
+    assert results[0] == results[2]
+    assert results[0][0] != results[1][0]
+
+
+def test_malformed_item_falls_back_alone(prompts, monkeypatch):
+    recording = intent_engine._generate_sync
+
+    def corrupt_second(prompt):
+        items = json.loads(recording(prompt))
+        items[1] = {"not": "an intent"}
+        return json.dumps(items)
+
+    monkeypatch.setattr(intent_engine, "_generate_sync", corrupt_second)
+    results = _resolve_all(MESSAGES[:3])
+
+    assert len(prompts) == 1
+    assert [source for _, source in results] == ["llm", "keywords", "llm"]
+    assert results[1][0] == intent_engine._keyword_fallback(MESSAGES[1])
+    # The batch-mates' answers were kept (and cached)
+    assert intent_engine._get_intent_cache().get(intent_engine._cache_key(MESSAGES[0])) is not None
+    assert intent_engine._get_intent_cache().get(intent_engine._cache_key(MESSAGES[1])) is None
+
+
+def test_unparseable_batch_falls_back_for_everyone(prompts, monkeypatch):
+    monkeypatch.setattr(intent_engine, "_generate_sync", lambda prompt: "sorry, I cannot help with that")
+    results = _resolve_all(MESSAGES[:3])
+
+    assert [source for _, source in results] == ["keywords"] * 3
+    assert [result for result, _ in results] == [intent_engine._keyword_fallback(t) for t in MESSAGES[:3]]
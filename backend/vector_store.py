@@ -1,59 +1,635 @@
 """
 SevaSetu — Lightweight Vector Store for Scheme Discovery
 Builds a semantic search index using TF-IDF and cosine similarity to fit in 512MB RAM.
+
+The fitted index is persisted as a versioned on-disk snapshot keyed by a hash of
+the scheme catalog. Workers memory-map the snapshot at startup and only refit when
+the catalog (or the snapshot format) changes.
+
+Each version of the index is an immutable IndexGeneration. Searches read one
+generation from start to finish; catalog edits build the next generation
+incrementally and publish it with a single reference swap.
 """
 
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from schemes_data import get_scheme_descriptions, get_scheme_by_id
+import scipy.sparse as sp
+import sklearn
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+import rule_tree
+from schemes_data import (
+    get_all_schemes, get_catalog, get_scheme_by_id, get_scheme_text, set_catalog,
+)
+
+# Bump whenever the on-disk layout or the vectorizer settings change
+SNAPSHOT_VERSION = 3
+INDEX_DIR = os.getenv("SEVASETU_INDEX_DIR", os.path.join(os.path.dirname(__file__), "index_cache"))
+
+# Number of incremental changes after which IDF weights are recomputed for the whole index
+REWEIGHT_BATCH = int(os.getenv("SEVASETU_REWEIGHT_BATCH", "32"))
+
+# Hits at or below this cosine similarity are not returned
+MIN_SCORE = 0.01
+
+# Categorical eligibility fields exposed as search filters
+RULE_FACETS = ("occupation", "residence", "gender")
+FILTER_FIELDS = ("state", "category") + RULE_FACETS
+
+# Same tokenisation as sklearn's TfidfVectorizer defaults
+_analyzer = CountVectorizer(stop_words='english').build_analyzer()
+
+# Current generation; replaced (never mutated) under _write_lock
+_current = None
+_write_lock = threading.Lock()
+_generation_counter = 0
+
+# name -> builder(gen); derived per-generation data (see register_generation_hook)
+_generation_hooks = {}
+
+
+class IndexGeneration:
+    """One immutable, self-consistent version of the TF-IDF index."""
+
+    def __init__(self, schemes: list, vocabulary: dict, idf, df, counts, matrix, pending: int = 0,
+                 postings=None, term_max=None):
+        global _generation_counter
+        _generation_counter += 1
+        self.number = _generation_counter
+        self.schemes = schemes
+        self.scheme_ids = [s["scheme_id"] for s in schemes]
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.df = df
+        self.counts = counts      # raw term counts, kept for incremental updates
+        self.matrix = matrix      # L2-normalised TF-IDF rows
+        self.pending = pending    # changes applied since IDF was last recomputed
 
-# Singleton instances
-_vectorizer = None
-_tfidf_matrix = None
-_scheme_ids = []
+        # Inverted index: column t of the CSC matrix is term t's posting list
+        # (sorted doc rows + weights); term_max bounds any document's weight for t.
+        # Both are passed in when loaded (memory-mapped) from a snapshot.
+        if postings is None:
+            postings = matrix.tocsc()
+            postings.sort_indices()
+        self.postings = postings
+        if term_max is None:
+            term_max = postings.max(axis=0).toarray().ravel() if matrix.nnz else np.zeros(matrix.shape[1])
+        self.term_max = term_max
 
+        # Bitmap (boolean mask) indexes used to pre-filter searches
+        self.facets = _build_facets(schemes)
 
-def build_index():
-    """Build the TF-IDF index from scheme descriptions."""
-    global _vectorizer, _tfidf_matrix, _scheme_ids
+        # Data derived by other modules, filled in when the generation is published
+        self.extras = {}
 
-    pairs = get_scheme_descriptions()
-    _scheme_ids = [sid for sid, _ in pairs]
-    texts = [text for _, text in pairs]
+    def __len__(self):
+        return len(self.schemes)
 
-    _vectorizer = TfidfVectorizer(stop_words='english')
-    _tfidf_matrix = _vectorizer.fit_transform(texts)
+    def extra(self, name: str):
+        """Return derived data registered with register_generation_hook."""
+        if name not in self.extras:
+            self.extras[name] = _generation_hooks[name](self)
+        return self.extras[name]
 
-    print(f"[VectorStore] Built TF-IDF index with {len(_scheme_ids)} schemes")
-    return _tfidf_matrix
 
+def register_generation_hook(name: str, builder):
+    """
+    Have builder(gen) run for every newly published generation; the result is
+    available as gen.extra(name). Lets other modules precompute per-catalog
+    arrays alongside the index instead of on each request.
+    """
+    _generation_hooks[name] = builder
 
-def search(query: str, top_k: int = 5):
-    """Search for schemes matching the query text."""
-    global _vectorizer, _tfidf_matrix, _scheme_ids
 
-    if _vectorizer is None or _tfidf_matrix is None:
-        build_index()
-        
-    if not query.strip():
+def _norm(value) -> str:
+    return str(value).strip().lower()
+
+
+def _rule_accepts(rule: dict, value: str) -> bool:
+    """Whether a categorical rule passes for a (normalised) value."""
+    operator, expected = rule["operator"], rule["value"]
+    if operator in ("in", "not_in"):
+        found = value in {_norm(v) for v in expected}
+        return found if operator == "in" else not found
+    if operator in ("eq", "neq"):
+        return (value == _norm(expected)) == (operator == "eq")
+    return True
+
+
+def mandatory_rules(scheme: dict, field: str) -> list:
+    """Rules on field that an applicant must pass (rules under OR logic are optional)."""
+    eligibility = scheme.get("eligibility_rules")
+    if not eligibility:
         return []
+    return [r for r in rule_tree.mandatory_leaves(rule_tree.normalize(eligibility)) if r["field"] == field]
+
+
+def rule_value_masks(schemes: list, field: str):
+    """
+    Bitmaps for a categorical rule field. Returns (masks, restricted) where
+    masks maps each value mentioned by a rule to the schemes whose mandatory
+    rules accept it (None -> mask for values no rule mentions) and restricted
+    marks schemes that have any mandatory rule on the field.
+    """
+    rules = [mandatory_rules(s, field) for s in schemes]
+    values = set()
+    for scheme_rules in rules:
+        for r in scheme_rules:
+            expected = r["value"]
+            values.update(_norm(v) for v in (expected if isinstance(expected, list) else [expected]))
+    masks = {}
+    for value in list(values) + [None]:
+        masks[value] = np.fromiter(
+            (all(_rule_accepts(r, value) for r in scheme_rules) for scheme_rules in rules),
+            dtype=bool, count=len(schemes),
+        )
+    restricted = np.fromiter((bool(r) for r in rules), dtype=bool, count=len(schemes))
+    return masks, restricted
+
+
+def _build_facets(schemes: list) -> dict:
+    """
+    Build facet -> {value: mask} bitmap indexes. Each facet also has a None entry:
+    the mask used for values that do not appear in the catalog.
+
+    State masks include schemes available in ALL states. Rule facets come from
+    the eligibility rules: a scheme is in a value's mask unless one of its
+    mandatory (AND) rules on that field rejects the value.
+    """
+    n = len(schemes)
+    facets = {}
+
+    states = np.array([_norm(s.get("state", "ALL")) for s in schemes], dtype=object)
+    nationwide = states == "all"
+    facets["state"] = {value: (states == value) | nationwide for value in set(states)}
+    facets["state"][None] = nationwide
+
+    categories = np.array([_norm(s.get("category", "")) for s in schemes], dtype=object)
+    facets["category"] = {value: categories == value for value in set(categories)}
+    facets["category"][None] = np.zeros(n, dtype=bool)
+
+    for field in RULE_FACETS:
+        facets[field], _ = rule_value_masks(schemes, field)
+
+    return facets
+
+
+def filter_mask(gen: "IndexGeneration", filters: dict):
+    """
+    Combine filters into one boolean mask over the generation's rows (None if no
+    filter applies). Each filter value may be a single value or a list of
+    acceptable values; fields are AND-ed together.
+    """
+    mask = None
+    for field, wanted in (filters or {}).items():
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unsupported filter '{field}'. Use one of: {', '.join(FILTER_FIELDS)}")
+        if wanted is None or wanted == []:
+            continue
+        masks = gen.facets[field]
+        field_mask = np.zeros(len(gen), dtype=bool)
+        for value in (wanted if isinstance(wanted, list) else [wanted]):
+            field_mask |= masks.get(_norm(value), masks[None])
+        mask = field_mask if mask is None else mask & field_mask
+    return mask
+
+
+def _idf(df: np.ndarray, n_docs: int) -> np.ndarray:
+    """
+    Smoothed IDF, identical to TfidfVectorizer(smooth_idf=True). Terms that no
+    longer occur in any document get weight 0 so they do not dilute query vectors.
+    """
+    return np.where(df > 0, np.log((1 + n_docs) / (1 + df)) + 1, 0.0)
+
+
+def _weigh(counts, idf: np.ndarray):
+    """Apply IDF weights to a count matrix and L2-normalise each row."""
+    weighted = sp.csr_matrix(
+        (counts.data * idf[counts.indices], counts.indices.copy(), counts.indptr.copy()),
+        shape=counts.shape,
+    )
+    if weighted.shape[0] == 0:
+        return weighted
+    return normalize(weighted, norm="l2", copy=False)
+
+
+def _widen(matrix, n_terms: int):
+    """Reshape a CSR matrix to a larger vocabulary without copying its arrays."""
+    return sp.csr_matrix((matrix.data, matrix.indices, matrix.indptr),
+                         shape=(matrix.shape[0], n_terms), copy=False)
+
+
+def _count_rows(texts: list, vocabulary: dict, grow: bool = False):
+    """
+    Count vocabulary terms in each text. With grow=True unseen terms are added to
+    the vocabulary (which must then be a private copy); otherwise they are dropped.
+    """
+    rows, cols = [], []
+    for i, text in enumerate(texts):
+        for token in _analyzer(text):
+            j = vocabulary.get(token)
+            if j is None:
+                if not grow:
+                    continue
+                j = vocabulary[token] = len(vocabulary)
+            rows.append(i)
+            cols.append(j)
+    counts = sp.csr_matrix(
+        (np.ones(len(cols), dtype=np.int32), (rows, cols)),
+        shape=(len(texts), len(vocabulary)),
+    )
+    counts.sum_duplicates()
+    return counts
+
+
+def _fit(schemes: list) -> IndexGeneration:
+    """Fit a fresh generation from a full list of schemes."""
+    vectorizer = CountVectorizer(stop_words='english')
+    counts = vectorizer.fit_transform([get_scheme_text(s) for s in schemes]).astype(np.int32)
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    idf = _idf(df, counts.shape[0])
+    return IndexGeneration(schemes, dict(vectorizer.vocabulary_), idf, df, counts, _weigh(counts, idf))
+
+
+def _catalog_hash(pairs: list) -> str:
+    """Content hash of the indexed texts plus everything that affects fitting."""
+    h = hashlib.sha256()
+    h.update(f"v{SNAPSHOT_VERSION}|sklearn-{sklearn.__version__}".encode())
+    h.update(json.dumps(pairs, ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _snapshot_path(catalog_hash: str) -> str:
+    return os.path.join(INDEX_DIR, f"tfidf-v{SNAPSHOT_VERSION}-{catalog_hash[:16]}")
+
+
+def _save_snapshot(path: str, catalog_hash: str, gen: IndexGeneration):
+    """Write the snapshot to a temp dir and rename it into place atomically."""
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=INDEX_DIR)
+    try:
+        terms = [None] * len(gen.vocabulary)
+        for term, idx in gen.vocabulary.items():
+            terms[idx] = term
+        with open(os.path.join(tmp, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        np.save(os.path.join(tmp, "idf.npy"), gen.idf)
+        np.save(os.path.join(tmp, "df.npy"), gen.df)
+        np.save(os.path.join(tmp, "term_max.npy"), gen.term_max)
+        for prefix, matrix in (("counts", gen.counts), ("tfidf", gen.matrix), ("postings", gen.postings)):
+            np.save(os.path.join(tmp, f"{prefix}_data.npy"), matrix.data)
+            np.save(os.path.join(tmp, f"{prefix}_indices.npy"), matrix.indices)
+            np.save(os.path.join(tmp, f"{prefix}_indptr.npy"), matrix.indptr)
+        # meta.json is written last; its presence marks a complete snapshot
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "version": SNAPSHOT_VERSION,
+                "catalog_hash": catalog_hash,
+                "shape": list(gen.matrix.shape),
+                "scheme_ids": gen.scheme_ids,
+            }, f)
+        os.rename(tmp, path)
+        _prune_snapshots(keep=path)
+    except OSError:
+        # Another worker won the race (or the disk is read-only) — keep serving from memory
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _prune_snapshots(keep: str):
+    """Remove snapshots of older catalogs; mapped files stay valid for their readers."""
+    for name in os.listdir(INDEX_DIR):
+        path = os.path.join(INDEX_DIR, name)
+        if name.startswith("tfidf-") and path != keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _load_snapshot(path: str, catalog_hash: str, lookup=get_scheme_by_id):
+    """Memory-map a snapshot. Returns an IndexGeneration or None."""
+    if not os.path.isdir(path):
+        return None
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != SNAPSHOT_VERSION or meta.get("catalog_hash") != catalog_hash:
+            return None
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+            terms = json.load(f)
+
+        schemes = [lookup(sid) for sid in meta["scheme_ids"]]
+        if any(s is None for s in schemes):
+            return None
+
+        shape = tuple(meta["shape"])
+        matrices = {}
+        for prefix, kind in (("counts", sp.csr_matrix), ("tfidf", sp.csr_matrix), ("postings", sp.csc_matrix)):
+            arrays = [np.load(os.path.join(path, f"{prefix}_{name}.npy"), mmap_mode="r")
+                      for name in ("data", "indices", "indptr")]
+            matrices[prefix] = kind(tuple(arrays), shape=shape, copy=False)
+        postings = matrices["postings"]
+        postings.has_sorted_indices = True  # saved sorted; the mapped arrays are read-only
+
+        vectors = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                   for name in ("idf", "df", "term_max")}
+        vocabulary = {term: idx for idx, term in enumerate(terms)}
+        return IndexGeneration(schemes, vocabulary, vectors["idf"], vectors["df"], matrices["counts"],
+                               matrices["tfidf"], postings=postings, term_max=vectors["term_max"])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[VectorStore] Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def _publish(gen: IndexGeneration) -> IndexGeneration:
+    """Make gen the generation seen by new searches (caller holds _write_lock)."""
+    global _current
+    for name, builder in _generation_hooks.items():
+        gen.extras[name] = builder(gen)
+    _current = gen
+    return gen
+
+
+def build_index(force: bool = False, catalog=None) -> IndexGeneration:
+    """
+    Load the TF-IDF index from its snapshot, or fit and snapshot it.
+
+    With a catalog, the index is built for it first and then the catalog and
+    index are swapped in together; searches in flight finish on the old
+    generation and are never paused.
+    """
+    with _write_lock:
+        schemes = list(catalog.schemes if catalog is not None else get_all_schemes())
+        pairs = [(s["scheme_id"], get_scheme_text(s)) for s in schemes]
+        catalog_hash = _catalog_hash(pairs)
+        path = _snapshot_path(catalog_hash)
+
+        lookup = catalog.get if catalog is not None else get_scheme_by_id
+        gen = None if force else _load_snapshot(path, catalog_hash, lookup)
+        if gen:
+            print(f"[VectorStore] Loaded TF-IDF snapshot with {len(gen)} schemes ({catalog_hash[:12]})")
+        else:
+            gen = _fit(schemes)
+            _save_snapshot(path, catalog_hash, gen)
+            print(f"[VectorStore] Built TF-IDF index with {len(gen)} schemes ({catalog_hash[:12]})")
+
+        if catalog is not None:
+            set_catalog(catalog)
+        return _publish(gen)
+
+
+def current_generation() -> IndexGeneration:
+    """Return the live index generation, building it on first use."""
+    gen = _current
+    if gen is None:
+        gen = build_index()
+    return gen
+
+
+def _apply_changes(upserts: list, deletes: list) -> IndexGeneration:
+    """
+    Derive the next catalog and generation from the current ones and publish
+    both. Done under _write_lock, like build_index, so concurrent edits and
+    catalog reloads never overwrite each other's catalog.
+    """
+    with _write_lock:
+        catalog = get_catalog().with_changes(upserts=upserts, deletes=deletes)
+        gen = _current or _fit(list(get_all_schemes()))
+
+        # Latest write wins when the same ID appears more than once
+        new_schemes = list({s["scheme_id"]: s for s in upserts}.values())
+        dropped = set(deletes) | {s["scheme_id"] for s in new_schemes}
+        deleted_ids = set(deletes) - {s["scheme_id"] for s in new_schemes}
+        new_schemes = [s for s in new_schemes if s["scheme_id"] not in deleted_ids]
+
+        keep = [i for i, sid in enumerate(gen.scheme_ids) if sid not in dropped]
+        gone = [i for i, sid in enumerate(gen.scheme_ids) if sid in dropped]
+
+        vocabulary = dict(gen.vocabulary)
+        new_counts = _count_rows([get_scheme_text(s) for s in new_schemes], vocabulary, grow=True)
+        n_terms = len(vocabulary)
+        n_docs = len(keep) + len(new_schemes)
+
+        df = np.zeros(n_terms, dtype=np.int64)
+        df[:len(gen.df)] = gen.df
+        df -= np.bincount(gen.counts[gone].indices, minlength=n_terms)
+        df += np.bincount(new_counts.indices, minlength=n_terms)
+
+        # Terms seen for the first time get an IDF right away; existing weights are
+        # only refreshed once enough changes have accumulated.
+        idf = np.concatenate([gen.idf, _idf(df[len(gen.idf):], n_docs)])
+        idf[df == 0] = 0.0
+
+        counts = sp.vstack([_widen(gen.counts[keep], n_terms), new_counts], format="csr")
+        pending = gen.pending + len(upserts) + len(deletes)
+        if pending >= REWEIGHT_BATCH:
+            idf = _idf(df, n_docs)
+            matrix = _weigh(counts, idf)
+            pending = 0
+        else:
+            matrix = sp.vstack([_widen(gen.matrix[keep], n_terms), _weigh(new_counts, idf)], format="csr")
+
+        schemes = [gen.schemes[i] for i in keep] + new_schemes
+        gen = IndexGeneration(schemes, vocabulary, idf, df, counts, matrix, pending)
+        set_catalog(catalog)
+        return _publish(gen)
+
+
+def upsert_schemes(schemes: list) -> IndexGeneration:
+    """Add or replace schemes in the catalog and index them incrementally."""
+    gen = _apply_changes(schemes, [])
+    print(f"[VectorStore] Upserted {len(schemes)} scheme(s) -> generation {gen.number}")
+    return gen
+
+
+def delete_schemes(scheme_ids: list) -> IndexGeneration:
+    """Retire schemes from the catalog and drop them from the index."""
+    gen = _apply_changes([], scheme_ids)
+    print(f"[VectorStore] Deleted {len(scheme_ids)} scheme(s) -> generation {gen.number}")
+    return gen
+
+
+def upsert_scheme(scheme: dict) -> IndexGeneration:
+    """Add or replace a single scheme."""
+    return upsert_schemes([scheme])
+
+
+def delete_scheme(scheme_id: str) -> IndexGeneration:
+    """Retire a single scheme."""
+    return delete_schemes([scheme_id])
+
+
+def reweight() -> IndexGeneration:
+    """Recompute IDF weights for the whole index now instead of waiting for the batch."""
+    with _write_lock:
+        gen = _current
+        if gen is None or gen.pending == 0:
+            return gen
+        idf = _idf(gen.df, len(gen))
+        return _publish(IndexGeneration(gen.schemes, gen.vocabulary, idf, gen.df,
+                                        gen.counts, _weigh(gen.counts, idf)))
+
+
+def transform(gen: IndexGeneration, texts: list):
+    """Vectorise query texts against a generation's vocabulary and IDF weights."""
+    return _weigh(_count_rows(texts, gen.vocabulary), gen.idf)
+
+
+def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k highest scores, best first (argpartition + small sort)."""
+    n = scores.shape[0]
+    if top_k >= n:
+        return np.argsort(-scores, kind="stable")
+    part = np.argpartition(-scores, top_k - 1)[:top_k]
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def _ranked(docs: np.ndarray, scores: np.ndarray, top_k: int):
+    """Best-first (rows, scores) of the top_k candidates scoring above MIN_SCORE."""
+    best = _top_k(scores, top_k)
+    best = best[scores[best] > MIN_SCORE]
+    return docs[best], scores[best]
+
+
+def _collect(gen: IndexGeneration, docs: np.ndarray, scores: np.ndarray) -> list:
+    """Turn ranked rows and their similarity scores into the search result list."""
+    return [
+        {"scheme": gen.schemes[doc], "score": float(score)}
+        for doc, score in zip(docs, scores)
+    ]
+
+
+def _maxscore(gen: IndexGeneration, terms: np.ndarray, weights: np.ndarray, top_k: int, mask=None):
+    """
+    Term-at-a-time top-k retrieval with MaxScore pruning.
+
+    Query terms are processed in decreasing order of their score upper bound
+    (query weight x term_max). While the bounds of the unprocessed terms still
+    add up to more than the current k-th best partial score, postings may admit
+    new candidates; after that, only existing candidates are updated, and those
+    whose partial score plus the remaining bound cannot reach the k-th best are
+    dropped. Work is proportional to the query's posting lists, not the catalog.
+    Rows outside mask (if given) are removed from postings before they are scored.
+
+    Returns (candidate rows, scores).
+    """
+    bounds = weights * gen.term_max[terms]
+    order = np.argsort(-bounds, kind="stable")
+    terms, weights, bounds = terms[order], weights[order], bounds[order]
+    # remaining[i] = best score a document could still collect from terms i..end
+    remaining = np.append(np.cumsum(bounds[::-1])[::-1], 0.0)
+
+    indptr, indices, data = gen.postings.indptr, gen.postings.indices, gen.postings.data
+    cand = np.empty(0, dtype=indices.dtype)
+    acc = np.empty(0)
+    threshold = MIN_SCORE
+
+    for i, term in enumerate(terms):
+        if remaining[i] <= threshold and len(cand) == 0:
+            break
+        start, end = indptr[term], indptr[term + 1]
+        docs = indices[start:end]
+        contrib = weights[i] * data[start:end]
+        if mask is not None:
+            allowed = mask[docs]
+            docs, contrib = docs[allowed], contrib[allowed]
+
+        if remaining[i] > threshold:
+            # Unseen documents can still make the cut: merge the whole posting list
+            merged, inverse = np.unique(np.concatenate([cand, docs]), return_inverse=True)
+            acc = np.bincount(inverse, weights=np.concatenate([acc, contrib]), minlength=len(merged))
+            cand = merged
+        elif len(docs):
+            # Only score documents already in the candidate set
+            pos = np.minimum(np.searchsorted(docs, cand), len(docs) - 1)
+            hit = docs[pos] == cand
+            acc[hit] += contrib[pos[hit]]
+
+        if len(cand) >= top_k:
+            threshold = max(threshold, np.partition(acc, len(acc) - top_k)[len(acc) - top_k])
+        keep = acc + remaining[i + 1] >= threshold
+        if not keep.all():
+            cand, acc = cand[keep], acc[keep]
+
+    return cand, acc
+
+
+def search_many_rows(queries: list, top_k: int = 5, filters: dict = None):
+    """
+    Batched search returning (generation, [(rows, scores) per query]) with rows
+    and scores as best-first arrays; see search_many.
+    """
+    gen = current_generation()
+
+    empty = (np.empty(0, dtype=np.int64), np.empty(0))
+    results = [empty] * len(queries)
+    active = [i for i, q in enumerate(queries) if q and q.strip()]
+    if not active or top_k <= 0 or len(gen) == 0:
+        return gen, results
+
+    mask = filter_mask(gen, filters)
+    if mask is None:
+        rows, matrix = None, gen.matrix
+    else:
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return gen, results
+        matrix = gen.matrix[rows]
+
+    query_matrix = transform(gen, [queries[i] for i in active])
+    similarities = (query_matrix @ matrix.T).tocsr()
+    similarities.sort_indices()
+
+    for row, i in enumerate(active):
+        start, end = similarities.indptr[row], similarities.indptr[row + 1]
+        docs = similarities.indices[start:end]
+        if rows is not None:
+            docs = rows[docs]
+        results[i] = _ranked(docs, similarities.data[start:end], top_k)
+
+    return gen, results
+
+
+def search_many(queries: list, top_k: int = 5, filters: dict = None) -> list:
+    """
+    Search for several queries at once.
+
+    All queries are transformed into one sparse matrix and scored against the
+    index with a single sparse product. TF-IDF rows are L2-normalised, so the dot
+    product is the cosine similarity. Only non-zero scores are ranked per row,
+    so the cost follows the queries' posting lists. Filters (see filter_mask)
+    restrict the rows before scoring. Returns one result list per query, in order.
+    """
+    gen, results = search_many_rows(queries, top_k, filters)
+    return [_collect(gen, docs, scores) for docs, scores in results]
+
+
+def search_rows(query: str, top_k: int = 5, filters: dict = None):
+    """Single-query search returning (generation, rows, scores), best first."""
+    gen = current_generation()
+    if not query.strip() or top_k <= 0 or len(gen) == 0:
+        return gen, np.empty(0, dtype=np.int64), np.empty(0)
+
+    mask = filter_mask(gen, filters)
+    query_vec = transform(gen, [query])
+    docs, scores = _maxscore(gen, query_vec.indices, query_vec.data, top_k, mask)
+    docs, scores = _ranked(docs, scores, top_k)
+    return gen, docs, scores
+
+
+def search(query: str, top_k: int = 5, filters: dict = None):
+    """
+    Search for schemes matching the query text.
 
-    query_vec = _vectorizer.transform([query])
-    similarities = cosine_similarity(query_vec, _tfidf_matrix).flatten()
-    
-    # Get top_k matching indices descending
-    top_indices = similarities.argsort()[::-1][:top_k]
-
-    results = []
-    for idx in top_indices:
-        score = similarities[idx]
-        if score > 0.01:
-            scheme = get_scheme_by_id(_scheme_ids[idx])
-            if scheme:
-                results.append({
-                    "scheme": scheme,
-                    "score": float(score),
-                })
-
-    return results
+    Args:
+        query: free-text query
+        top_k: maximum number of results
+        filters: optional {field: value or [values]} over state (schemes for
+            ALL states always match), category, occupation, residence, gender
+    """
+    gen, docs, scores = search_rows(query, top_k, filters)
+    return _collect(gen, docs, scores)
@@ -4,7 +4,7 @@ import VoiceInput from '../components/VoiceInput';
 import SchemeCard from '../components/SchemeCard';
 import DocumentUpload from '../components/DocumentUpload';
 import {
-    extractIntent, matchSchemes, validateEligibility,
+    extractIntentAndMatch, refineIntentMatch, validateEligibility,
     validateDocuments, generateForm, generateGrievance,
     getDownloadUrl,
 } from '../services/api';
@@ -38,6 +38,25 @@ export default function Assistant({ onBack }) {
     const messagesEndRef = useRef(null);
 
     /* ─── Step 1: Input → Intent + Scheme discovery ─── */
+    const applyIntentMatch = (res) => {
+        setIntentResult(res.extracted_intent);
+        setSchemes(res.scheme_match?.schemes || []);
+
+        // Pre-fill profile from extracted attributes
+        const ka = res.extracted_intent.key_attributes || {};
+        setUserProfile(prev => ({
+            ...prev,
+            ...(ka.age && { age: ka.age }),
+            ...(ka.occupation && { occupation: ka.occupation }),
+            ...(ka.income && { income: ka.income }),
+            ...(ka.category && { category: ka.category }),
+            ...(ka.gender && { gender: ka.gender }),
+            ...(ka.state && { state: ka.state }),
+            ...(ka.residence && { residence: ka.residence }),
+            ...(ka.land_holding && { land_holding: ka.land_holding }),
+        }));
+    };
+
     const handleSubmitInput = async (text) => {
         const finalText = text || inputText;
         if (!finalText.trim()) return;
@@ -46,27 +65,16 @@ export default function Assistant({ onBack }) {
         setError('');
 
         try {
-            const intentRes = await extractIntent(finalText);
-            setIntentResult(intentRes.extracted_intent);
-
-            const query = intentRes.extracted_intent.summary || finalText;
-            const attrs = intentRes.extracted_intent.key_attributes || {};
-            const schemeRes = await matchSchemes(query, attrs);
-            setSchemes(schemeRes.schemes || []);
-
-            // Pre-fill profile from extracted attributes
-            const ka = intentRes.extracted_intent.key_attributes || {};
-            setUserProfile(prev => ({
-                ...prev,
-                ...(ka.age && { age: ka.age }),
-                ...(ka.occupation && { occupation: ka.occupation }),
-                ...(ka.income && { income: ka.income }),
-                ...(ka.category && { category: ka.category }),
-                ...(ka.gender && { gender: ka.gender }),
-                ...(ka.state && { state: ka.state }),
-                ...(ka.residence && { residence: ka.residence }),
-                ...(ka.land_holding && { land_holding: ka.land_holding }),
-            }));
+            // Fast answer (keywords + search on the raw text) first; the LLM refinement follows
+            const res = await extractIntentAndMatch(finalText);
+            applyIntentMatch(res);
+            if (res.status === 'pending' && res.refine_token) {
+                refineIntentMatch(res.refine_token)
+                    .then(refined => {
+                        if (refined.status === 'final' && refined.changed) applyIntentMatch(refined);
+                    })
+                    .catch(() => { /* keep the fast answer */ });
+            }
 
             setStep('schemes');
         } catch (err) {
@@ -32,6 +32,19 @@ export async function extractIntent(text, sessionId = null) {
     });
 }
 
+/** POST /intent-match — fast intent + scheme matches; may return a refine_token */
+export async function extractIntentAndMatch(text, sessionId = null, topK = 5) {
+    return request('/intent-match', {
+        method: 'POST',
+        body: JSON.stringify({ text, session_id: sessionId, top_k: topK }),
+    });
+}
+
+/** GET /intent-match/:token — long-poll for the LLM-refined answer */
+export async function refineIntentMatch(refineToken, wait = 10) {
+    return request(`/intent-match/${refineToken}?wait=${wait}`);
+}
+
 /** POST /scheme-match — semantic search for schemes */
 export async function matchSchemes(query, attributes = null, topK = 5) {
     return request('/scheme-match', {
@@ -48,6 +61,14 @@ export async function validateEligibility(schemeId, userProfile) {
     });
 }
 
+/** POST /eligibility/all — evaluate a profile against every scheme */
+export async function checkAllEligibility(userProfile, state = null, limit = 20) {
+    return request('/eligibility/all', {
+        method: 'POST',
+        body: JSON.stringify({ user_profile: userProfile, state, limit }),
+    });
+}
+
 /** POST /upload-documents — upload a document */
 export async function uploadDocument(file, documentType, userId = 'demo-user') {
     const formData = new FormData();
@@ -63,9 +84,16 @@ export async function uploadDocument(file, documentType, userId = 'demo-user') {
     return res.json();
 }
 
-/** POST /extract-ocr/{id} — extract data from document */
+/** POST /extract-ocr/{id} — extract data from document (polls if the OCR job outlasts the request) */
 export async function extractOCR(documentId) {
-    return request(`/extract-ocr/${documentId}`, { method: 'POST' });
+    let res = await request(`/extract-ocr/${documentId}`, { method: 'POST' });
+    while (res.status === 'queued') {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const job = await request(`/extract-ocr/${documentId}`);
+        if (job.status === 'failed') throw new Error(job.error || 'OCR extraction failed');
+        res = job.result || job;
+    }
+    return res;
 }
 
 /** POST /validate-documents — cross-validate documents */
@@ -9,6 +9,7 @@ REGION="ap-south-1"
 DOCUMENTS_BUCKET="sevasetu-documents"
 FORMS_BUCKET="sevasetu-forms"
 DYNAMO_TABLE="sevasetu-sessions"
+DOCUMENTS_TABLE="sevasetu-documents"
 
 echo "============================================"
 echo " SevaSetu — AWS Resource Setup"
@@ -33,7 +34,7 @@ echo "  ✓ CORS configured on $FORMS_BUCKET"
 
 # 2. Create DynamoDB Table
 echo ""
-echo "[2/3] Creating DynamoDB table..."
+echo "[2/3] Creating DynamoDB tables..."
 
 aws dynamodb create-table \
     --table-name $DYNAMO_TABLE \
@@ -44,6 +45,17 @@ aws dynamodb create-table \
     echo "  ✓ Created table: $DYNAMO_TABLE" || \
     echo "  ⚠ Table $DYNAMO_TABLE already exists"
 
+# Document metadata: looked up by document_id, listed per user via the GSI
+aws dynamodb create-table \
+    --table-name $DOCUMENTS_TABLE \
+    --attribute-definitions AttributeName=document_id,AttributeType=S AttributeName=user_id,AttributeType=S AttributeName=uploaded_at,AttributeType=S \
+    --key-schema AttributeName=document_id,KeyType=HASH \
+    --global-secondary-indexes "IndexName=user_id-index,KeySchema=[{AttributeName=user_id,KeyType=HASH},{AttributeName=uploaded_at,KeyType=RANGE}],Projection={ProjectionType=ALL}" \
+    --billing-mode PAY_PER_REQUEST \
+    --region $REGION 2>/dev/null && \
+    echo "  ✓ Created table: $DOCUMENTS_TABLE" || \
+    echo "  ⚠ Table $DOCUMENTS_TABLE already exists"
+
 # 3. Verify Bedrock model access
 echo ""
 echo "[3/3] Checking Bedrock model access..."
@@ -55,7 +67,7 @@ echo ""
 echo "============================================"
 echo " Setup complete!"
 echo " S3 buckets: $DOCUMENTS_BUCKET, $FORMS_BUCKET"
-echo " DynamoDB:   $DYNAMO_TABLE"
+echo " DynamoDB:   $DYNAMO_TABLE, $DOCUMENTS_TABLE"
 echo " Region:     $REGION"
 echo "============================================"
 echo ""